@@ -0,0 +1,207 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Any
+
+class ProposalScoringQueue:
+    """
+    Background worker pool that scores proposals and patches the result
+    into the proposal document
+    """
+    def __init__(self,
+                 proposals_collection,
+                 scorer: Callable[[Dict[str, Any]], float],
+                 max_workers: int = 4,
+                 max_retries: int = 3,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 30.0,
+                 on_scored: Callable[[Any, dict], None] = None):
+        """
+        Args:
+            proposals_collection: Mongo collection holding the proposals
+            scorer (Callable): Returns a success probability, raises on failure
+            max_workers (int): Maximum number of concurrent scoring calls
+            max_retries (int): Retries after the first failed attempt
+            backoff_base (float): Initial retry delay in seconds
+            backoff_max (float): Upper bound for a single retry delay
+            on_scored (Callable, optional): Called with (proposal_id, prediction)
+                after a prediction is stored
+        """
+        self.proposals = proposals_collection
+        self.scorer = scorer
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.on_scored = on_scored
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-scoring')
+
+    @staticmethod
+    def pending_prediction() -> dict:
+        """
+        Placeholder stored on a proposal until scoring finishes
+        """
+        return {
+            'status': 'pending',
+            'success_probability': None,
+            'attempts': 0,
+            'updated_at': datetime.utcnow()
+        }
+
+    @staticmethod
+    def completed_prediction(success_probability: float, attempts: int) -> dict:
+        return {
+            'status': 'completed',
+            'success_probability': success_probability,
+            'attempts': attempts,
+            'updated_at': datetime.utcnow()
+        }
+
+    @staticmethod
+    def failed_prediction(error: Exception, attempts: int) -> dict:
+        return {
+            'status': 'failed',
+            'success_probability': None,
+            'attempts': attempts,
+            'error': str(error),
+            'updated_at': datetime.utcnow()
+        }
+
+    def submit(self, proposal_id, proposal_data: Dict[str, Any]) -> Future:
+        """
+        Queue a proposal for scoring
+        """
+        return self.executor.submit(self._score, proposal_id, dict(proposal_data))
+
+    def resubmit_pending(self, limit: int = 1000) -> int:
+        """
+        Re-queue proposals left pending, e.g. by a restart
+
+        Returns:
+            Number of proposals queued
+        """
+        pending = self.proposals.find(
+            {'ai_prediction.status': 'pending'},
+            {'title': 1, 'description': 1}
+        ).limit(limit)
+
+        count = 0
+        for proposal in pending:
+            self.submit(proposal['_id'], proposal)
+            count += 1
+        return count
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+    def _score(self, proposal_id, proposal_data: Dict[str, Any]) -> dict:
+        attempts = 0
+        last_error = None
+
+        while attempts <= self.max_retries:
+            attempts += 1
+            try:
+                prediction = self.completed_prediction(self.scorer(proposal_data), attempts)
+                self.proposals.update_one({'_id': proposal_id}, {'$set': {'ai_prediction': prediction}})
+                self._notify(proposal_id, prediction)
+                return prediction
+            except Exception as e:
+                last_error = e
+                print(f"AI scoring attempt {attempts} failed for {proposal_id}: {e}")
+                if attempts <= self.max_retries:
+                    time.sleep(self._backoff(attempts))
+
+        prediction = self.failed_prediction(last_error, attempts)
+        self.proposals.update_one({'_id': proposal_id}, {'$set': {'ai_prediction': prediction}})
+        self._notify(proposal_id, prediction)
+        return prediction
+
+    def _notify(self, proposal_id, prediction: dict):
+        if self.on_scored is None:
+            return
+        try:
+            self.on_scored(proposal_id, prediction)
+        except Exception as e:
+            print(f"AI scoring callback error for {proposal_id}: {e}")
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, delay)
+
+class AsyncProposalScoringQueue:
+    """
+    asyncio counterpart of ProposalScoringQueue for the ASGI app: scoring
+    runs as event-loop tasks and the result is patched in with an async
+    Mongo collection
+    """
+    def __init__(self,
+                 proposals_collection,
+                 scorer: Callable[[Dict[str, Any]], Awaitable[float]],
+                 max_concurrency: int = 16,
+                 max_retries: int = 3,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 30.0,
+                 on_scored: Callable[[Any, dict], Awaitable[None]] = None):
+        """
+        Args:
+            proposals_collection: Async (motor) collection holding the proposals
+            scorer (Callable): Coroutine function returning a success probability
+            max_concurrency (int): Maximum number of concurrent scoring calls
+            max_retries (int): Retries after the first failed attempt
+            backoff_base (float): Initial retry delay in seconds
+            backoff_max (float): Upper bound for a single retry delay
+            on_scored (Callable, optional): Coroutine function called with
+                (proposal_id, prediction) after a prediction is stored
+        """
+        self.proposals = proposals_collection
+        self.scorer = scorer
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.on_scored = on_scored
+        self._semaphore = None
+        # Keep references so running tasks are not garbage collected
+        self._tasks = set()
+
+    def submit(self, proposal_id, proposal_data: Dict[str, Any]) -> asyncio.Task:
+        """
+        Schedule a proposal for scoring on the running event loop
+        """
+        task = asyncio.get_running_loop().create_task(self._score(proposal_id, dict(proposal_data)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _score(self, proposal_id, proposal_data: Dict[str, Any]) -> dict:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        attempts = 0
+        last_error = None
+        async with self._semaphore:
+            while attempts <= self.max_retries:
+                attempts += 1
+                try:
+                    prediction = ProposalScoringQueue.completed_prediction(await self.scorer(proposal_data), attempts)
+                    break
+                except Exception as e:
+                    last_error = e
+                    print(f"AI scoring attempt {attempts} failed for {proposal_id}: {e}")
+                    if attempts <= self.max_retries:
+                        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+                        await asyncio.sleep(random.uniform(0, delay))
+            else:
+                prediction = ProposalScoringQueue.failed_prediction(last_error, attempts)
+
+        await self.proposals.update_one({'_id': proposal_id}, {'$set': {'ai_prediction': prediction}})
+        if self.on_scored is not None:
+            try:
+                await self.on_scored(proposal_id, prediction)
+            except Exception as e:
+                print(f"AI scoring callback error for {proposal_id}: {e}")
+        return prediction
@@ -0,0 +1,201 @@
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import List, Tuple
+import numpy as np
+import scipy.sparse as sp
+from sklearn.random_projection import SparseRandomProjection
+from sklearn.preprocessing import normalize
+from similarity_index import top_k_rows
+
+class _ReducedBackend(ABC):
+    """
+    Shared plumbing for approximate backends: vectors are projected to a
+    small dense space for candidate generation, and candidates are re-ranked
+    with exact cosine similarity on the full TF-IDF vectors.
+    """
+    def __init__(self, dim: int = 256, seed: int = 0):
+        self.dim = dim
+        self.seed = seed
+        self.size = 0
+        self.projection = None
+
+    def _reduce(self, matrix: sp.csr_matrix) -> np.ndarray:
+        if self.projection is None:
+            self.projection = SparseRandomProjection(n_components=self.dim, dense_output=True, random_state=self.seed)
+            self.projection.fit(matrix[:1])
+        return normalize(np.asarray(self.projection.transform(matrix)))
+
+    @abstractmethod
+    def fit(self, matrix: sp.csr_matrix):
+        """
+        Build the backend over the rows of a normalized corpus matrix
+        """
+
+    @abstractmethod
+    def add(self, matrix: sp.csr_matrix):
+        """
+        Append rows to the backend
+        """
+
+    @abstractmethod
+    def candidates(self, reduced_query: np.ndarray) -> np.ndarray:
+        """
+        Candidate corpus positions for one reduced query vector
+        """
+
+    def search(self, queries: sp.csr_matrix, corpus: sp.csr_matrix, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top_k search, re-ranking candidates against the corpus
+
+        Returns:
+            Match indices and scores, each of shape (queries, top_k). Rows
+            with fewer than top_k candidates are padded with -1 / -inf.
+        """
+        reduced = self._reduce(queries)
+        indices = np.full((queries.shape[0], top_k), -1, dtype=np.int64)
+        scores = np.full((queries.shape[0], top_k), -np.inf)
+
+        for row in range(queries.shape[0]):
+            candidates = self.candidates(reduced[row])
+            if len(candidates) == 0:
+                continue
+            row_scores = (corpus[candidates] @ queries[row].T).toarray().T
+            top, top_scores = top_k_rows(row_scores, top_k)
+            indices[row, :top.shape[1]] = candidates[top[0]]
+            scores[row, :top.shape[1]] = top_scores[0]
+        return indices, scores
+
+class LSHBackend(_ReducedBackend):
+    """
+    Random-projection (SimHash) LSH over reduced vectors
+
+    Recall/latency knobs: more tables or probing neighbouring buckets
+    (probe_radius=1 flips each bit) raise recall; more bits per table shrink
+    buckets and lower latency. The defaults reach recall@10 of about 0.78 on
+    50k proposals (benchmarks/ann_recall.py), but scan more candidates than
+    IVFBackend does for similar recall; IVFBackend is the backend to attach
+    unless its k-means build time matters.
+    """
+    def __init__(self, n_bits: int = 10, n_tables: int = 16, probe_radius: int = 1, dim: int = 256, seed: int = 0):
+        super().__init__(dim, seed)
+        self.n_bits = n_bits
+        self.n_tables = n_tables
+        self.probe_radius = probe_radius
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables, dim, n_bits))
+        self.bit_weights = 1 << np.arange(n_bits)
+        self.tables = [defaultdict(list) for _ in range(n_tables)]
+
+    def _codes(self, reduced: np.ndarray) -> np.ndarray:
+        bits = np.einsum('nd,tdb->ntb', reduced, self.planes) > 0
+        return bits.astype(np.int64) @ self.bit_weights
+
+    def fit(self, matrix: sp.csr_matrix):
+        self.tables = [defaultdict(list) for _ in range(self.n_tables)]
+        self.size = 0
+        self.add(matrix)
+
+    def add(self, matrix: sp.csr_matrix):
+        codes = self._codes(self._reduce(matrix))
+        for offset, row_codes in enumerate(codes):
+            for table, code in zip(self.tables, row_codes):
+                table[int(code)].append(self.size + offset)
+        self.size += matrix.shape[0]
+
+    def candidates(self, reduced_query: np.ndarray) -> np.ndarray:
+        found = set()
+        for table, code in zip(self.tables, self._codes(reduced_query[None, :])[0]):
+            code = int(code)
+            found.update(table.get(code, ()))
+            if self.probe_radius:
+                for bit in self.bit_weights:
+                    found.update(table.get(code ^ int(bit), ()))
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+class IVFBackend(_ReducedBackend):
+    """
+    Inverted-file index: spherical k-means clusters over reduced vectors
+
+    Recall/latency knob: n_probe, the number of closest clusters scanned
+    per query.
+    """
+    def __init__(self, n_lists: int = 256, n_probe: int = 8, dim: int = 256,
+                 train_size: int = 50000, n_iter: int = 10, seed: int = 0):
+        super().__init__(dim, seed)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size
+        self.n_iter = n_iter
+        self.centroids = None
+        self.lists = []
+
+    def fit(self, matrix: sp.csr_matrix):
+        reduced = self._reduce(matrix)
+        rng = np.random.default_rng(self.seed)
+        sample = reduced[rng.choice(len(reduced), min(len(reduced), self.train_size), replace=False)]
+
+        n_lists = min(self.n_lists, len(sample))
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(self.n_iter):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+
+        self.centroids = centroids
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self.size = 0
+        self._add_reduced(reduced)
+
+    def add(self, matrix: sp.csr_matrix):
+        self._add_reduced(self._reduce(matrix))
+
+    def _add_reduced(self, reduced: np.ndarray):
+        assignment = np.argmax(reduced @ self.centroids.T, axis=1)
+        positions = np.arange(self.size, self.size + len(reduced))
+        for list_id in np.unique(assignment):
+            self.lists[list_id] = np.concatenate([self.lists[list_id], positions[assignment == list_id]])
+        self.size += len(reduced)
+
+    def candidates(self, reduced_query: np.ndarray) -> np.ndarray:
+        centroid_scores = self.centroids @ reduced_query
+        n_probe = min(self.n_probe, len(self.centroids))
+        probed = np.argpartition(centroid_scores, -n_probe)[-n_probe:]
+        return np.concatenate([self.lists[list_id] for list_id in probed])
+
+def evaluate_recall(index, queries: List[dict], top_k: int = 10) -> dict:
+    """
+    Compare an index's ANN backend against exact search
+
+    Args:
+        index (ProposalSimilarityIndex): Index with a backend attached
+        queries (List[dict]): Query proposals
+        top_k (int): k for recall@k
+
+    Returns:
+        Dict with recall@k and mean per-query latency of both paths
+    """
+    query_matrix = index.transform(queries)
+    index.search_many(query_matrix[:1], top_k)  # warm up both paths
+    index.search_many(query_matrix[:1], top_k, exact=True)
+
+    start = time.perf_counter()
+    exact, _ = index.search_many(query_matrix, top_k, exact=True)
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    approximate, _ = index.search_many(query_matrix, top_k)
+    approximate_time = time.perf_counter() - start
+
+    # -1 pads rows with fewer than top_k matches; padding is not a hit
+    hits = sum(len((set(e.tolist()) & set(a.tolist())) - {-1}) for e, a in zip(exact, approximate))
+    relevant = int(np.count_nonzero(exact != -1))
+    return {
+        'recall_at_k': hits / relevant if relevant else 1.0,
+        'top_k': top_k,
+        'exact_ms_per_query': exact_time / len(queries) * 1000,
+        'approximate_ms_per_query': approximate_time / len(queries) * 1000
+    }
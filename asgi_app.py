@@ -0,0 +1,286 @@
+"""
+Async (ASGI) serving mode for the proposal, vote and analytics API
+
+Same routes and responses as app.py, but handlers await Mongo (motor) and
+the model API instead of blocking a worker thread, so one process can hold
+thousands of requests in flight. CPU-bound signature recovery runs on a
+thread pool. In-memory components (vote tally buffer, rollups, tally hub,
+signature cache) are shared with app.py, so both modes count votes the
+same way. The Flask app keeps working unchanged.
+
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+
+The proposal service's background jobs start when app.py is imported,
+unless BACKGROUND_JOBS=false (see service_host.py).
+"""
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import DuplicateKeyError
+from quart import Quart, request, jsonify, Response
+import serialization
+from mongo_pool import mongo
+from ai_scoring import AsyncProposalScoringQueue, ProposalScoringQueue
+from conditional import ResourceVersions
+from governance_stats import GovernanceStats
+from vote_ledger import VoteLedger
+from vote_tally import VoteTallyBuffer
+import app as governance_api
+
+app = Quart(__name__)
+serialization.init_app(app)
+
+async def score_proposal(proposal_data):
+    ai_response = await governance_api.model_client.acomplete(**governance_api.scoring_request(proposal_data))
+    return governance_api.extract_success_probability(ai_response)
+
+async def record_scored_proposal(proposal_id, prediction):
+    operations = ResourceVersions.bump_operations('proposals')
+    await mongo.async_db.resource_versions.bulk_write(operations, ordered=False)
+    if prediction['status'] == 'completed':
+        await apply_stats_delta(ai_prediction=prediction['success_probability'])
+
+async def apply_stats_delta(**delta):
+    update = GovernanceStats.delta_update(**delta)
+    if update is not None:
+        await mongo.async_db.governance_stats.update_one({'_id': GovernanceStats.STATS_ID}, update)
+
+async def resource_etag(key, *parts):
+    document = await mongo.async_db.resource_versions.find_one({'_id': key}, {'version': 1})
+    return ResourceVersions.make_etag(key, document['version'] if document else 0, *parts)
+
+# Created before serving, so the motor client is bound to the serving event loop
+scoring_queue = None
+
+@app.before_serving
+async def create_scoring_queue():
+    global scoring_queue
+    scoring_queue = AsyncProposalScoringQueue(
+        mongo.async_db.proposals,
+        scorer=score_proposal,
+        max_concurrency=int(os.getenv('AI_SCORING_CONCURRENCY', 16)),
+        max_retries=int(os.getenv('AI_SCORING_MAX_RETRIES', 3)),
+        on_scored=record_scored_proposal
+    )
+
+@app.after_request
+async def allow_cors(response):
+    response.headers.setdefault('Access-Control-Allow-Origin', '*')
+    return response
+
+@app.route('/api/proposals', methods=['GET'])
+async def get_proposals():
+    """
+    Retrieve a page of proposals, streamed as JSON (see app.get_proposals)
+    """
+    try:
+        limit = min(int(request.args.get('limit', governance_api.DEFAULT_PAGE_SIZE)), governance_api.MAX_PAGE_SIZE)
+        if limit < 1:
+            return jsonify({'error': 'limit must be positive'}), 400
+
+        query = {}
+        cursor = request.args.get('cursor')
+        if cursor:
+            query['_id'] = {'$gt': ObjectId(cursor)}
+
+        fields = request.args.get('fields')
+        projection = governance_api.build_projection(fields)
+
+        etag = await resource_etag('proposals', limit, cursor, fields)
+        if request.if_none_match.contains(etag):
+            response = Response(b'', status=304)
+        else:
+            proposals = mongo.async_db.proposals.find(query, projection) \
+                .sort('_id', 1) \
+                .limit(limit) \
+                .batch_size(min(limit, 100))
+            response = Response(stream_proposal_page(proposals, limit), status=200, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'public, no-cache'
+        return response
+    except (ValueError, InvalidId):
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+async def stream_proposal_page(proposals, limit):
+    """
+    Yield a page of proposals as JSON chunks, one document at a time
+    """
+    count = 0
+    last_id = None
+    yield b'{"proposals":['
+    async for proposal in proposals:
+        yield (b',' if count else b'') + serialization.dumps_bytes(proposal)
+        count += 1
+        last_id = proposal['_id']
+
+    # A short page means the collection is exhausted
+    next_cursor = str(last_id) if count == limit else None
+    yield b'],"next_cursor":' + serialization.dumps_bytes(next_cursor) + b'}'
+
+@app.route('/api/proposals', methods=['POST'])
+async def create_proposal():
+    """
+    Create a new proposal; scoring runs as a background task
+    """
+    try:
+        proposal_data = await request.get_json()
+        proposal_data['ai_prediction'] = ProposalScoringQueue.pending_prediction()
+
+        result = await mongo.async_db.proposals.insert_one(proposal_data)
+        await apply_stats_delta(proposals=1)
+        await mongo.async_db.resource_versions.bulk_write(ResourceVersions.bump_operations('proposals'), ordered=False)
+
+        scoring_queue.submit(result.inserted_id, proposal_data)
+
+        return jsonify({
+            'message': 'Proposal created successfully',
+            'proposal_id': str(result.inserted_id),
+            'ai_prediction': {'status': 'pending'}
+        }), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/proposals/<proposal_id>/ai-prediction', methods=['GET'])
+async def get_ai_prediction(proposal_id):
+    """
+    Retrieve the AI scoring status of a proposal
+    """
+    try:
+        proposal = await mongo.async_db.proposals.find_one(
+            {'_id': ObjectId(proposal_id)},
+            {'ai_prediction': 1}
+        )
+        if not proposal:
+            return jsonify({'error': 'Proposal not found'}), 404
+
+        prediction = proposal.get('ai_prediction') or {}
+        return jsonify({
+            'proposal_id': proposal_id,
+            'status': prediction.get('status'),
+            'success_probability': prediction.get('success_probability'),
+            'attempts': prediction.get('attempts'),
+            'error': prediction.get('error')
+        }), 200
+    except InvalidId:
+        return jsonify({'error': 'Invalid proposal ID'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/proposals/<proposal_id>/vote', methods=['POST'])
+async def vote_on_proposal(proposal_id):
+    """
+    Process a vote on a specific proposal
+    """
+    try:
+        vote_data = await request.get_json()
+
+        # Signature recovery is CPU-bound, so keep it off the event loop
+        is_valid_signature = await asyncio.to_thread(governance_api.validate_blockchain_signature, vote_data)
+        if not is_valid_signature:
+            return jsonify({'error': 'Invalid voter signature'}), 403
+
+        proposal_object_id = ObjectId(proposal_id)
+        vote = VoteLedger.build_vote(proposal_object_id, vote_data)
+        VoteTallyBuffer.validate_direction(vote['vote_direction'])
+
+        if not await mongo.async_db.proposals.find_one({'_id': proposal_object_id}, {'_id': 1}):
+            return jsonify({'error': 'Proposal not found'}), 404
+
+        try:
+            await mongo.async_db.votes.insert_one(vote)
+        except DuplicateKeyError:
+            return jsonify({
+                'message': 'Vote already recorded',
+                'duplicate': True
+            }), 200
+
+        # Off the event loop: immediate mode writes, and buffered mode flushes
+        # inline with a blocking bulk_write once its shard is full
+        tally_result = await asyncio.to_thread(governance_api.vote_tally.record, proposal_object_id, vote['vote_direction'])
+        governance_api.vote_rollups.record(proposal_object_id, vote['vote_direction'], vote['created_at'])
+
+        return jsonify({
+            'message': 'Vote recorded successfully',
+            'duplicate': False,
+            **tally_result
+        }), 200
+    except (ValueError, InvalidId, KeyError) as e:
+        return jsonify({'error': f'Invalid vote: {e}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/proposals/<proposal_id>/tally', methods=['GET'])
+async def get_proposal_tally(proposal_id):
+    """
+    Retrieve live vote totals, including votes not yet flushed
+    """
+    try:
+        proposal_object_id = ObjectId(proposal_id)
+        proposal = await mongo.async_db.proposals.find_one({'_id': proposal_object_id}, {'votes': 1}) or {}
+        votes = governance_api.vote_tally.with_pending(proposal_object_id, proposal.get('votes'))
+
+        etag = hashlib.sha1(serialization.dumps(sorted(votes.items())).encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(b'', status=304)
+        else:
+            response = jsonify({'proposal_id': proposal_id, 'votes': votes})
+        response.set_etag(etag)
+        return response
+    except InvalidId:
+        return jsonify({'error': 'Invalid proposal ID'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics', methods=['GET'])
+async def get_governance_analytics():
+    """
+    Retrieve comprehensive governance analytics
+    """
+    try:
+        document = await mongo.async_db.governance_stats.find_one({'_id': GovernanceStats.STATS_ID})
+        if not GovernanceStats.is_bootstrapped(document):
+            return jsonify([await asyncio.to_thread(governance_api.governance_stats.read)]), 200
+        return jsonify([GovernanceStats.summarize(document)]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/votes', methods=['GET'])
+async def get_vote_time_series():
+    """
+    Retrieve vote counts bucketed by minute, hour or day (see app.get_vote_time_series)
+    """
+    try:
+        granularity = request.args.get('granularity', 'hour')
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else datetime.utcnow()
+        start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=1)
+        proposal_id = request.args.get('proposal_id')
+
+        query = governance_api.vote_rollups.series_query(
+            granularity,
+            start,
+            end,
+            proposal_id=ObjectId(proposal_id) if proposal_id else None
+        )
+        buckets = mongo.async_db.vote_rollups.find(query, {'_id': 0, 'bucket': 1, 'votes': 1}) \
+            .sort('bucket', 1) \
+            .limit(10000)
+        return jsonify({
+            'granularity': granularity,
+            'proposal_id': proposal_id,
+            'series': [
+                {'bucket': bucket['bucket'].isoformat(), 'votes': bucket.get('votes', {})}
+                async for bucket in buckets
+            ]
+        }), 200
+    except (ValueError, InvalidId) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+if __name__ == '__main__':
+    app.run(debug=True, port=int(os.getenv('ASGI_PORT', 5005)))
@@ -0,0 +1,201 @@
+import atexit
+import queue
+import threading
+import time
+from typing import Callable, List
+from pymongo.errors import BulkWriteError
+from token_ledger import DUPLICATE_KEY_ERROR
+
+class BufferedAuditWriter:
+    """
+    Writes audit events to Mongo in batches from a background thread
+
+    Durability: in 'async' mode an event is acknowledged once it is queued,
+    so events still queued are lost if the process dies without running its
+    exit hooks. In 'sync' mode every event is inserted before returning, as
+    before.
+
+    Backpressure: the queue holds at most max_queue events. When it is full,
+    'block' makes the caller wait up to block_timeout seconds for room and
+    then fail the event; 'drop' fails it at once.
+    """
+    def __init__(self,
+                 collection,
+                 mode: str = 'async',
+                 batch_size: int = 500,
+                 flush_interval: float = 0.2,
+                 max_queue: int = 10000,
+                 overflow: str = 'block',
+                 block_timeout: float = 1.0,
+                 max_retries: int = 3,
+                 on_flushed: Callable[[List[dict]], None] = None):
+        """
+        Args:
+            collection: Mongo collection for audit events
+            mode (str): 'async' or 'sync'
+            batch_size (int): Most events per insert_many
+            flush_interval (float): Longest an event waits for its batch to fill
+            max_queue (int): Queued events before backpressure applies
+            overflow (str): 'block' or 'drop' when the queue is full
+            block_timeout (float): Seconds a 'block' caller waits for room
+            max_retries (int): Attempts per batch before it is dropped
+            on_flushed (Callable, optional): Called with each batch once written
+        """
+        if mode not in ('async', 'sync'):
+            raise ValueError(f"Unknown audit log mode: {mode}")
+        if overflow not in ('block', 'drop'):
+            raise ValueError(f"Unknown audit overflow policy: {overflow}")
+
+        self.collection = collection
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.on_flushed = on_flushed
+        self.written = 0
+        self.rejected = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._writer = None
+        self._start_lock = threading.Lock()
+
+    def write(self, event: dict) -> bool:
+        """
+        Write or enqueue one event
+
+        Returns:
+            False if the event was rejected by backpressure
+        """
+        if self.mode == 'sync' or self._stop.is_set():
+            self._insert([event])
+            return True
+
+        self._ensure_writer()
+        try:
+            if self.overflow == 'block':
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            self.rejected += 1
+            print(f"Audit queue full, event {event.get('_id')} rejected")
+            return False
+
+        # stop() may have begun after the check above, with the writer
+        # already gone; if so, write what is still queued here
+        if self._stop.is_set():
+            self._drain()
+        return True
+
+    def flush(self):
+        """
+        Wait until every queued event has been written or dropped
+        """
+        if self._writer is not None:
+            self._queue.join()
+
+    def stop(self, timeout: float = 10):
+        """
+        Write the remaining events and stop the background thread
+        """
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join(timeout=timeout)
+        self._drain()
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.mode,
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'rejected': self.rejected,
+            'failed': self.failed
+        }
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._writer.start()
+                atexit.register(self.stop)
+
+    def _next_batch(self) -> List[dict]:
+        """
+        Block for the first event, then fill the batch until it is full or
+        flush_interval has passed
+        """
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write_batch(batch)
+
+    def _drain(self):
+        """
+        Write every queued event from the calling thread
+        """
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[dict]):
+        try:
+            self._insert(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Audit write error, {len(batch)} events dropped: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _insert(self, events: List[dict]):
+        """
+        insert_many with retries; events already written by an earlier
+        attempt fail on their _id and are skipped
+        """
+        for attempt in range(self.max_retries):
+            try:
+                self.collection.insert_many(events, ordered=False)
+                break
+            except BulkWriteError as e:
+                if all(error['code'] == DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                    break
+                if attempt == self.max_retries - 1:
+                    raise
+            except Exception:
+                if attempt == self.max_retries - 1:
+                    raise
+            time.sleep(0.1 * 2 ** attempt)
+
+        self.written += len(events)
+        if self.on_flushed is not None:
+            try:
+                self.on_flushed(events)
+            except Exception as e:
+                print(f"Audit flush callback error: {e}")
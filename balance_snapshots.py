@@ -0,0 +1,299 @@
+"""
+Point-in-time governance token balances
+
+A balance at time t is the latest checkpoint at or before t plus the
+ledger entries between that checkpoint and t, so a lookup never replays
+more than one checkpoint interval of a user's history.
+
+Checkpoints are written by periodic runs. Each run sums the ledger entries
+since the previous completed run and stores a new checkpoint for every user
+who had activity; other users keep their older, still valid, checkpoint.
+Runs stop BALANCE_CHECKPOINT_SETTLE seconds short of now, so entries still
+being written are picked up by the next run.
+
+    python balance_snapshots.py checkpoint
+
+Entries backdated before the last completed run (e.g. by
+`python token_ledger.py migrate`) are not seen by later runs; rebuild the
+checkpoints afterwards:
+
+    python balance_snapshots.py rebuild
+"""
+import argparse
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterable, Optional
+from bson import ObjectId
+from eth_utils import to_checksum_address
+from pymongo.errors import BulkWriteError
+from periodic import PeriodicTask
+from token_ledger import DUPLICATE_KEY_ERROR
+
+# Checkpoint-run bookkeeping shares the collection; it has no user_id
+RUN_MARKER_ID = 'completed_run'
+
+class BalanceSnapshots:
+    """
+    Periodic per-user balance checkpoints over the token ledger
+    """
+    def __init__(self,
+                 users_collection,
+                 ledger_collection,
+                 checkpoints_collection,
+                 settle_seconds: float = 60.0,
+                 batch_size: int = 1000):
+        """
+        Args:
+            users_collection: Mongo collection holding the users (for wallet addresses)
+            ledger_collection: Mongo collection of token ledger entries
+            checkpoints_collection: Mongo collection for balance checkpoints
+            settle_seconds (float): How far behind now a checkpoint run stops
+            batch_size (int): Users per checkpoint lookup and ledger replay
+        """
+        self.users = users_collection
+        self.ledger = ledger_collection
+        self.checkpoints = checkpoints_collection
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def completed_through(self) -> Optional[datetime]:
+        """
+        Time covered by the last completed checkpoint run, if any
+        """
+        marker = self.checkpoints.find_one({'_id': RUN_MARKER_ID})
+        return marker['completed_through'] if marker else None
+
+    def create_checkpoints(self, at: datetime = None) -> int:
+        """
+        Checkpoint every user with ledger activity since the last completed run
+
+        Checkpoint ids are deterministic, so concurrent or repeated runs for
+        the same time write each checkpoint once.
+
+        Args:
+            at (datetime, optional): Checkpoint time; defaults to now minus
+                settle_seconds
+
+        Returns:
+            Number of checkpoints written
+        """
+        at = at or datetime.utcnow() - timedelta(seconds=self.settle_seconds)
+        since = self.completed_through()
+        if since is not None and at <= since:
+            return 0
+
+        window = {'$lte': at}
+        if since is not None:
+            window['$gt'] = since
+        changes = self.ledger.aggregate([
+            {'$match': {'timestamp': window}},
+            {'$group': {'_id': '$user_id', 'change': {'$sum': '$amount'}}}
+        ], allowDiskUse=True)
+
+        written = 0
+        for batch in self._batches(changes):
+            # A user's latest checkpoint up to the last run covers everything before it
+            previous = self._latest_checkpoints([change['_id'] for change in batch], since) if since else {}
+            written += self._insert_checkpoints([
+                {
+                    '_id': f"{change['_id']}:{at.isoformat()}",
+                    'user_id': change['_id'],
+                    'timestamp': at,
+                    'balance': previous.get(change['_id'], {}).get('balance', 0) + change['change']
+                }
+                for change in batch
+            ])
+
+        self.checkpoints.update_one(
+            {'_id': RUN_MARKER_ID},
+            {'$max': {'completed_through': at}},
+            upsert=True
+        )
+        return written
+
+    def rebuild(self, at: datetime = None) -> int:
+        """
+        Drop all checkpoints and recompute them from the full ledger
+        """
+        self.checkpoints.delete_many({})
+        return self.create_checkpoints(at)
+
+    def _batches(self, documents: Iterable[dict]) -> Iterable[List[dict]]:
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _insert_checkpoints(self, documents: List[dict]) -> int:
+        if not documents:
+            return 0
+        try:
+            return len(self.checkpoints.insert_many(documents, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            if any(error['code'] != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                raise
+            return e.details.get('nInserted', 0)
+
+    def _latest_checkpoints(self, user_ids: List[Any], at: datetime) -> Dict[Any, dict]:
+        """
+        Latest checkpoint at or before `at` for each of the users that have one
+        """
+        latest = self.checkpoints.aggregate([
+            {'$match': {'user_id': {'$in': user_ids}, 'timestamp': {'$lte': at}}},
+            {'$sort': {'user_id': 1, 'timestamp': -1}},
+            {'$group': {
+                '_id': '$user_id',
+                'timestamp': {'$first': '$timestamp'},
+                'balance': {'$first': '$balance'}
+            }}
+        ])
+        return {checkpoint['_id']: checkpoint for checkpoint in latest}
+
+    def balances_at(self, user_ids: Iterable[Any], at: datetime) -> Dict[Any, int]:
+        """
+        Balances of many users at one point in time
+
+        Args:
+            user_ids: Users to look up
+            at (datetime): Point in time, inclusive
+
+        Returns:
+            Balance per user id; users without ledger entries have 0
+        """
+        balances = {}
+        user_ids = list(dict.fromkeys(user_ids))
+        for offset in range(0, len(user_ids), self.batch_size):
+            batch = user_ids[offset:offset + self.batch_size]
+            latest = self._latest_checkpoints(batch, at)
+
+            # Users checkpointed by the same run share one replay window
+            by_checkpoint_time = defaultdict(list)
+            for user_id in batch:
+                checkpoint = latest.get(user_id)
+                balances[user_id] = checkpoint['balance'] if checkpoint else 0
+                by_checkpoint_time[checkpoint['timestamp'] if checkpoint else None].append(user_id)
+
+            windows = []
+            for checkpoint_time, window_user_ids in by_checkpoint_time.items():
+                window = {'$lte': at}
+                if checkpoint_time is not None:
+                    window['$gt'] = checkpoint_time
+                windows.append({'user_id': {'$in': window_user_ids}, 'timestamp': window})
+
+            replay = self.ledger.aggregate([
+                {'$match': {'$or': windows}},
+                {'$group': {'_id': '$user_id', 'change': {'$sum': '$amount'}}}
+            ])
+            for change in replay:
+                balances[change['_id']] += change['change']
+        return balances
+
+    def balance_at(self, user_id, at: datetime) -> int:
+        """
+        Balance of one user at a point in time (inclusive)
+        """
+        return self.balances_at([user_id], at)[user_id]
+
+    @staticmethod
+    def proposal_snapshot_time(proposal: dict) -> datetime:
+        """
+        A proposal's explicit snapshot_at, or else its creation time
+        """
+        if proposal.get('snapshot_at'):
+            snapshot_at = proposal['snapshot_at']
+            return snapshot_at if isinstance(snapshot_at, datetime) else datetime.fromisoformat(snapshot_at)
+        return proposal['_id'].generation_time.replace(tzinfo=None)
+
+    def _users_by_wallet(self, addresses: List[str]) -> Dict[str, Any]:
+        """
+        User id per lower-cased wallet address
+
+        Votes store lower-cased addresses, while users may have registered
+        a checksummed one, so both spellings are looked up.
+        """
+        spellings = set(addresses)
+        for address in addresses:
+            try:
+                spellings.add(to_checksum_address(address))
+            except ValueError:
+                pass
+        users = self.users.find({'wallet_address': {'$in': list(spellings)}}, {'wallet_address': 1})
+        return {user['wallet_address'].lower(): user['_id'] for user in users}
+
+    def voter_weights(self, votes_collection, proposal_id: ObjectId, at: datetime) -> dict:
+        """
+        Snapshot balance of every voter on a proposal, in one pass over its votes
+
+        Args:
+            votes_collection: Mongo collection of the vote ledger
+            proposal_id (ObjectId): Proposal whose voters are weighed
+            at (datetime): Snapshot time
+
+        Returns:
+            Weight per voter address, weighted totals per direction, and
+            the number of voters with no registered wallet (weight 0)
+        """
+        weights = {}
+        totals = defaultdict(int)
+        unlinked_voters = 0
+        votes = votes_collection.find(
+            {'proposal_id': proposal_id},
+            {'_id': 0, 'voter_address': 1, 'vote_direction': 1}
+        ).batch_size(self.batch_size)
+
+        for batch in self._batches(votes):
+            users_by_wallet = self._users_by_wallet([vote['voter_address'] for vote in batch])
+            balances = self.balances_at(users_by_wallet.values(), at)
+            for vote in batch:
+                user_id = users_by_wallet.get(vote['voter_address'])
+                if user_id is None:
+                    unlinked_voters += 1
+                weight = balances.get(user_id, 0) if user_id is not None else 0
+                weights[vote['voter_address']] = weight
+                totals[vote['vote_direction']] += weight
+
+        return {
+            'snapshot_at': at,
+            'weights': weights,
+            'totals': dict(totals),
+            'unlinked_voters': unlinked_voters
+        }
+
+    def start(self, interval: float):
+        """
+        Create checkpoints every `interval` seconds on a background thread
+        """
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    self._worker = PeriodicTask(self.create_checkpoints, interval, 'balance-checkpoints')
+        self._worker.start()
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.stop(timeout=5)
+
+def main():
+    from dotenv import load_dotenv
+    from mongo_pool import mongo
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['checkpoint', 'rebuild'])
+    args = parser.parse_args()
+
+    snapshots = BalanceSnapshots(mongo.db.users, mongo.db.token_ledger, mongo.db.balance_checkpoints)
+    if args.command == 'checkpoint':
+        print(f"{snapshots.create_checkpoints()} checkpoints written")
+    else:
+        print(f"{snapshots.rebuild()} checkpoints written")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator, List, Any, Optional
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (float, optional): Burst size, defaults to one second of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """
+        Block until the requested number of tokens is available
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_time = (tokens - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+class BatchRunner:
+    """
+    Runs a blocking function over many items on a bounded thread pool,
+    with rate limiting and per-item retries
+    """
+    def __init__(self,
+                 max_concurrency: int = 8,
+                 rate_per_second: Optional[float] = None,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 10.0):
+        """
+        Args:
+            max_concurrency (int): Maximum number of items in flight
+            rate_per_second (float, optional): Call rate limit across all workers
+            max_retries (int): Retries after the first failed attempt of an item
+            backoff_base (float): Initial retry delay in seconds
+            backoff_max (float): Upper bound for a single retry delay
+        """
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = TokenBucket(rate_per_second) if rate_per_second else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def stream(self, func: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[dict]:
+        """
+        Yield item results as they finish
+
+        Each result is a dict with index, success, result, error and attempts.
+        Only max_concurrency items are submitted at a time, so the input can
+        be a lazy iterable of any length.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='batch') as executor:
+            pending = set()
+            for index, item in enumerate(items):
+                if len(pending) >= self.max_concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(executor.submit(self._run_item, func, index, item))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def run(self, func: Callable[[Any], Any], items: List[Any]) -> dict:
+        """
+        Process all items and return an ordered report
+
+        Returns:
+            Dict with results in input order (None for failed items),
+            the failed item results, and success/failure counts
+        """
+        results = [None] * len(items)
+        failures = []
+        for item_result in self.stream(func, items):
+            if item_result['success']:
+                results[item_result['index']] = item_result['result']
+            else:
+                failures.append(item_result)
+
+        failures.sort(key=lambda failure: failure['index'])
+        return {
+            'results': results,
+            'failures': failures,
+            'succeeded': len(items) - len(failures),
+            'failed': len(failures)
+        }
+
+    def _run_item(self, func: Callable[[Any], Any], index: int, item: Any) -> dict:
+        attempts = 0
+        while True:
+            attempts += 1
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            try:
+                return {
+                    'index': index,
+                    'success': True,
+                    'result': func(item),
+                    'error': None,
+                    'attempts': attempts
+                }
+            except Exception as e:
+                if attempts > self.max_retries:
+                    return {
+                        'index': index,
+                        'success': False,
+                        'result': None,
+                        'error': str(e),
+                        'attempts': attempts
+                    }
+                # Full jitter keeps retrying workers from synchronizing
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+                time.sleep(random.uniform(0, delay))
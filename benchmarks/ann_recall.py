@@ -0,0 +1,64 @@
+"""
+Recall@k and latency of the approximate similarity backends against exact
+search, swept over each backend's recall/latency knob.
+
+Usage:
+    python -m benchmarks.ann_recall --size 200000 --top-k 10
+"""
+import argparse
+import random
+import time
+from ann_index import LSHBackend, IVFBackend, evaluate_recall
+from similarity_index import ProposalSimilarityIndex
+
+def make_clustered_proposals(count: int, n_topics: int = 1000, seed: int = 0) -> list:
+    """
+    Synthetic proposals drawn from topic-specific vocabularies, so that
+    nearest neighbours are meaningful rather than near-ties
+    """
+    rng = random.Random(seed)
+    noise = [f'common{i}' for i in range(2000)]
+    topics = [[f'topic{t}word{w}' for w in range(40)] for t in range(n_topics)]
+    proposals = []
+    for _ in range(count):
+        topic = rng.choice(topics)
+        words = rng.choices(topic, k=30) + rng.choices(noise, k=10)
+        proposals.append({'title': ' '.join(words[:4]), 'description': ' '.join(words[4:])})
+    return proposals
+
+def report(label: str, result: dict):
+    print(f"  {label:<28} recall@{result['top_k']}={result['recall_at_k']:.3f}  "
+          f"exact={result['exact_ms_per_query']:.2f} ms  "
+          f"ann={result['approximate_ms_per_query']:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=10)
+    args = parser.parse_args()
+
+    corpus = make_clustered_proposals(args.size)
+    # Queries are perturbed copies of corpus proposals, so true neighbours exist
+    queries = [
+        {'title': p['title'], 'description': p['description'][:len(p['description']) // 2]}
+        for p in corpus[:args.queries]
+    ]
+
+    index = ProposalSimilarityIndex()
+    index.add(corpus)
+    print(f"corpus={args.size} queries={args.queries}")
+
+    for n_probe in (1, 4, 16, 64):
+        start = time.perf_counter()
+        index.backend = IVFBackend(n_lists=1024, n_probe=n_probe)
+        index.search_many(queries[:1])
+        build = time.perf_counter() - start
+        report(f"IVF n_probe={n_probe} (build {build:.1f}s)", evaluate_recall(index, queries, args.top_k))
+
+    for n_tables, probe_radius in ((8, 0), (16, 0), (8, 1), (16, 1)):
+        index.backend = LSHBackend(n_tables=n_tables, probe_radius=probe_radius)
+        report(f"LSH tables={n_tables} radius={probe_radius}", evaluate_recall(index, queries, args.top_k))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+HTTP load test comparing the Flask (WSGI) and Quart (ASGI) serving modes
+
+Start both servers against the same database first, e.g.:
+
+    gunicorn -w 4 --threads 8 -b :5000 app:app
+    hypercorn -w 4 -b :5005 asgi_app:app
+
+Then:
+
+    python -m benchmarks.api_load_test --target flask=http://localhost:5000 \\
+        --target asgi=http://localhost:5005 --concurrency 500 --requests 20000
+
+Each scenario fires --requests requests with --concurrency in flight and
+reports throughput, latency percentiles and errors. Votes are signed by
+fresh accounts before the clock starts, so signing cost is not measured.
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+import aiohttp
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def signed_votes(count: int) -> List[dict]:
+    votes = []
+    for i in range(count):
+        account = Account.create()
+        message = f'load-test vote {i}'
+        signature = Account.sign_message(encode_defunct(text=message), account.key).signature.hex()
+        votes.append({
+            'voter_address': account.address,
+            'vote_direction': 'for' if i % 2 else 'against',
+            'message': message,
+            'signature': signature
+        })
+    return votes
+
+async def run_scenario(session: aiohttp.ClientSession,
+                       make_request: Callable[[aiohttp.ClientSession, int], object],
+                       total: int,
+                       concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                async with make_request(session, index) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests_per_second': total / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'errors': errors
+    }
+
+async def run_target(name: str, base_url: str, args, votes: List[dict]):
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=timeout) as session:
+        async with session.post('/api/proposals', json={
+            'title': f'Load test proposal ({name})',
+            'description': 'Created by benchmarks.api_load_test'
+        }) as response:
+            proposal_id = (await response.json())['proposal_id']
+
+        scenarios = {
+            'list proposals': lambda s, i: s.get('/api/proposals', params={'limit': 20}),
+            'tally': lambda s, i: s.get(f'/api/proposals/{proposal_id}/tally'),
+            'analytics': lambda s, i: s.get('/api/analytics'),
+            'vote': lambda s, i: s.post(f'/api/proposals/{proposal_id}/vote', json=votes[i])
+        }
+        for scenario, make_request in scenarios.items():
+            result = await run_scenario(session, make_request, args.requests, args.concurrency)
+            print(f"{name:<6} {scenario:<15} {result['requests_per_second']:9,.0f} req/s  "
+                  f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                  f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True, help='name=base_url (repeatable)')
+    parser.add_argument('--requests', type=int, default=5000, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    targets = [target.split('=', 1) for target in args.target]
+    print(f"Signing {args.requests * len(targets)} votes...")
+    votes = signed_votes(args.requests * len(targets))
+
+    for position, (name, base_url) in enumerate(targets):
+        target_votes = votes[position * args.requests:(position + 1) * args.requests]
+        asyncio.run(run_target(name, base_url, args, target_votes))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Audit logging cost per request: one insert_one per event (sync mode)
+against batched background inserts (async mode). Runs the Flask app
+in-process with its test client, from several threads at once.
+
+Request latency is measured around POST /api/audit/log. Events/sec counts
+until every event is in Mongo, so async mode includes its final flush.
+
+Requires a MongoDB server; point MONGODB_URI at a throwaway database.
+
+Usage:
+    MONGODB_URI=mongodb://localhost:27017/votechain_benchmark \\
+        python -m benchmarks.audit_log_throughput --threads 16 --events 2000
+"""
+import argparse
+import threading
+import time
+import audit
+from audit_writer import BufferedAuditWriter
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run(mode: str, threads: int, events_per_thread: int, batch_size: int) -> dict:
+    audit.audit_writer = BufferedAuditWriter(
+        audit.mongo.db.audit_logs,
+        mode=mode,
+        batch_size=batch_size,
+        on_flushed=audit.bump_audit_versions
+    )
+    latencies = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def caller(index: int):
+        client = audit.app.test_client()
+        barrier.wait()
+        for i in range(events_per_thread):
+            start = time.perf_counter()
+            client.post('/api/audit/log', json={
+                'user_id': f'benchmark-user-{index}',
+                'event_type': 'benchmark',
+                'event_description': f'{mode} event {i}'
+            })
+            latencies[index].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=caller, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    audit.audit_writer.flush()
+    elapsed = time.perf_counter() - start
+    audit.audit_writer.stop()
+
+    merged = sorted(latency for thread_latencies in latencies for latency in thread_latencies)
+    return {
+        'events_per_second': len(merged) / elapsed,
+        'p50_ms': percentile(merged, 0.50) * 1000,
+        'p95_ms': percentile(merged, 0.95) * 1000,
+        'p99_ms': percentile(merged, 0.99) * 1000,
+        **audit.audit_writer.stats()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--events', type=int, default=2000, help='events per thread')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    audit.mongo.db.audit_logs.delete_many({'event_type': 'benchmark'})
+    for mode in ('sync', 'async'):
+        result = run(mode, args.threads, args.events, args.batch_size)
+        print(f"{mode:<6} {result['events_per_second']:10,.0f} events/sec  "
+              f"p50 {result['p50_ms']:6.2f} ms  p95 {result['p95_ms']:6.2f} ms  "
+              f"p99 {result['p99_ms']:6.2f} ms  rejected {result['rejected']}  failed {result['failed']}")
+    audit.mongo.db.audit_logs.delete_many({'event_type': 'benchmark'})
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Vote throughput of /api/votes/bulk by batch size, against one vote per
+request on /api/proposals/<id>/vote. Runs the Flask app in-process with
+its test client, so HTTP parsing is measured but not the network.
+
+Requires a MongoDB server; point MONGODB_URI at a throwaway database.
+
+Usage:
+    MONGODB_URI=mongodb://localhost:27017/votechain_benchmark \\
+        python -m benchmarks.bulk_vote_throughput --votes 4000 --batch-sizes 1,10,100,1000
+"""
+import argparse
+import os
+import time
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+# Keep the reconcilers and scoring resubmission out of the measurement
+os.environ.setdefault('BACKGROUND_JOBS', 'false')
+import app as governance_api
+
+def signed_votes(proposal_ids, count: int) -> list:
+    votes = []
+    for i in range(count):
+        account = Account.create()
+        message = f'benchmark vote {i}'
+        votes.append({
+            'proposal_id': proposal_ids[i % len(proposal_ids)],
+            'voter_address': account.address,
+            'vote_direction': 'for' if i % 2 else 'against',
+            'message': message,
+            'signature': Account.sign_message(encode_defunct(text=message), account.key).signature.hex()
+        })
+    return votes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--votes', type=int, default=4000, help='votes per run')
+    parser.add_argument('--proposals', type=int, default=10)
+    parser.add_argument('--batch-sizes', default='1,10,100,1000')
+    args = parser.parse_args()
+
+    client = governance_api.app.test_client()
+    proposal_ids = [
+        client.post('/api/proposals', json={'title': f'Bulk vote benchmark {i}'}).json['proposal_id']
+        for i in range(args.proposals)
+    ]
+
+    print(f"Signing {args.votes} votes per run...")
+    runs = [('single', None)] + [('bulk', int(size)) for size in args.batch_sizes.split(',')]
+    for mode, batch_size in runs:
+        # Fresh signers every run, so the signature cache never hits
+        votes = signed_votes(proposal_ids, args.votes)
+
+        start = time.perf_counter()
+        if mode == 'single':
+            for vote in votes:
+                client.post(f"/api/proposals/{vote['proposal_id']}/vote", json=vote)
+        else:
+            for offset in range(0, len(votes), batch_size):
+                client.post('/api/votes/bulk', json={'votes': votes[offset:offset + batch_size]})
+        elapsed = time.perf_counter() - start
+
+        label = 'one per request' if mode == 'single' else f'bulk, batch {batch_size}'
+        print(f"{label:<20} {args.votes / elapsed:10,.0f} votes/sec")
+
+    governance_api.vote_tally.stop()
+
+if __name__ == '__main__':
+    main()
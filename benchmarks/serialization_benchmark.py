@@ -0,0 +1,93 @@
+"""
+JSON serialization of large proposal and audit payloads: the stdlib
+encoder with an ObjectId hook (the old app.json_encoder) against the
+shared serialization layer, with and without orjson.
+
+Usage:
+    python -m benchmarks.serialization_benchmark --proposals 20000 --audit-logs 100000
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from bson import ObjectId
+import serialization
+
+class LegacyJSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return json.JSONEncoder.default(self, o)
+
+def make_proposals(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        {
+            '_id': ObjectId(),
+            'title': f'Proposal {i}: treasury allocation for ecosystem grants',
+            'description': 'Fund community grants from the treasury. ' * 20,
+            'ai_prediction': {'status': 'completed', 'success_probability': 0.73, 'attempts': 1, 'updated_at': now},
+            'votes': {'for': i * 3, 'against': i, 'abstain': i // 2, 'total_participants': i * 4 + i // 2},
+            'created_at': now - timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+def make_audit_logs(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        {
+            '_id': str(uuid.uuid4()),
+            'user_id': str(ObjectId()),
+            'event_type': 'vote_cast',
+            'event_description': 'User cast a vote on a governance proposal',
+            'timestamp': now - timedelta(seconds=i),
+            'ip_address': '10.0.0.1',
+            'user_agent': 'Mozilla/5.0',
+            'additional_metadata': {'proposal_id': ObjectId(), 'request_id': uuid.uuid4()}
+        }
+        for i in range(count)
+    ]
+
+def timed(label: str, func, payload, repeat: int = 3):
+    best = min(_run_once(func, payload) for _ in range(repeat))
+    print(f"  {label:<28} {best * 1000:10.1f} ms")
+
+def _run_once(func, payload) -> float:
+    start = time.perf_counter()
+    func(payload)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--proposals', type=int, default=20000)
+    parser.add_argument('--audit-logs', type=int, default=100000)
+    args = parser.parse_args()
+
+    orjson = serialization.orjson
+    payloads = {
+        f'{args.proposals} proposals': make_proposals(args.proposals),
+        f'{args.audit_logs} audit logs': make_audit_logs(args.audit_logs)
+    }
+    for name, payload in payloads.items():
+        print(name)
+        # The legacy encoder cannot handle UUIDs, so stringify them for a fair baseline
+        legacy_payload = json.loads(serialization.dumps(payload)) if 'audit' in name else payload
+        timed('stdlib + JSONEncoder', lambda p: json.dumps(p, cls=LegacyJSONEncoder), legacy_payload)
+
+        serialization.orjson = None
+        timed('serialization (fallback)', serialization.dumps_bytes, payload)
+        timed('streamed array (fallback)', lambda p: b''.join(serialization.iter_json_array(p)), payload)
+        serialization.orjson = orjson
+
+        if orjson is not None:
+            timed('serialization (orjson)', serialization.dumps_bytes, payload)
+            timed('streamed array (orjson)', lambda p: b''.join(serialization.iter_json_array(p)), payload)
+        else:
+            print('  orjson not installed')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Vote signature verification throughput: uncached single-core recovery,
+cached lookups, and process-pool batch verification.
+
+Usage:
+    python -m benchmarks.signature_throughput --votes 4000 --workers 4
+"""
+import argparse
+import os
+import time
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from signature_verifier import SignatureVerifier
+
+def make_votes(count: int) -> list:
+    accounts = [Account.create() for _ in range(min(count, 100))]
+    votes = []
+    for i in range(count):
+        account = accounts[i % len(accounts)]
+        message = f"vote:proposal-{i}:for"
+        signed = Account.sign_message(encode_defunct(text=message), private_key=account.key)
+        votes.append({
+            'message': message,
+            'signature': signed.signature.hex(),
+            'voter_address': account.address,
+            'vote_direction': 'for'
+        })
+    return votes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--votes', type=int, default=4000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    votes = make_votes(args.votes)
+
+    verifier = SignatureVerifier(max_workers=1)
+    start = time.perf_counter()
+    assert all(verifier.verify(vote) for vote in votes)
+    single = args.votes / (time.perf_counter() - start)
+    print(f"uncached, 1 core          {single:12,.0f} votes/sec")
+
+    start = time.perf_counter()
+    assert all(verifier.verify(vote) for vote in votes)
+    cached = args.votes / (time.perf_counter() - start)
+    print(f"cached                    {cached:12,.0f} votes/sec")
+
+    verifier = SignatureVerifier(max_workers=args.workers)
+    verifier.verify_batch(make_votes(verifier.min_parallel_batch))  # start the worker processes
+    start = time.perf_counter()
+    assert all(verifier.verify_batch(votes))
+    batch = args.votes / (time.perf_counter() - start)
+    print(f"batch, {args.workers} workers{'':<10} {batch:12,.0f} votes/sec "
+          f"({batch / args.workers:,.0f} per core)")
+    print(verifier.metrics())
+    verifier.shutdown()
+
+if __name__ == '__main__':
+    main()
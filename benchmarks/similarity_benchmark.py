@@ -0,0 +1,84 @@
+"""
+Benchmark proposal similarity search: full refit per query (the original
+find_similar_proposals) against the incremental index.
+
+Usage:
+    python -m benchmarks.similarity_benchmark --sizes 10000 100000
+"""
+import argparse
+import random
+import time
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from similarity_index import ProposalSimilarityIndex
+
+VOCABULARY = [
+    'treasury', 'grant', 'audit', 'voting', 'quorum', 'delegate', 'staking',
+    'bridge', 'oracle', 'liquidity', 'incentive', 'marketing', 'security',
+    'upgrade', 'contract', 'budget', 'community', 'council', 'emissions',
+    'validator', 'rewards', 'fees', 'protocol', 'governance', 'multisig',
+    'roadmap', 'partnership', 'research', 'compensation', 'insurance'
+]
+
+def make_proposals(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    words = VOCABULARY + [f'term{i}' for i in range(5000)]
+    return [
+        {
+            'title': ' '.join(rng.choices(VOCABULARY, k=4)),
+            'description': ' '.join(rng.choices(words, k=40))
+        }
+        for _ in range(count)
+    ]
+
+def baseline_find_similar(new_proposal, existing_proposals, top_k=5):
+    """
+    The original implementation: refit TF-IDF over corpus + query, full argsort
+    """
+    vectorizer = TfidfVectorizer(stop_words='english')
+    texts = [f"{p.get('title', '')} {p.get('description', '')}" for p in existing_proposals + [new_proposal]]
+    embeddings = vectorizer.fit_transform(texts)
+    similarities = cosine_similarity(embeddings[-1], embeddings[:-1])[0]
+    return np.argsort(similarities)[-top_k:][::-1]
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def run(size: int, queries: int, baseline_queries: int):
+    corpus = make_proposals(size)
+    query_proposals = make_proposals(queries, seed=1)
+
+    index = ProposalSimilarityIndex()
+    _, build_time = timed(index.add, corpus)
+    index.search(query_proposals[0])  # build the weighted corpus matrix once
+
+    baseline_times = [timed(baseline_find_similar, q, corpus)[1] for q in query_proposals[:baseline_queries]]
+    single_times = [timed(index.search, q, 5)[1] for q in query_proposals]
+    _, batch_time = timed(index.search_many, query_proposals, 5)
+
+    print(f"corpus={size:>7}")
+    print(f"  index build               {build_time * 1000:10.1f} ms")
+    print(f"  baseline per query        {np.mean(baseline_times) * 1000:10.1f} ms")
+    print(f"  index per query           {np.mean(single_times) * 1000:10.1f} ms")
+    print(f"  index batch ({queries} queries) {batch_time * 1000:8.1f} ms "
+          f"({batch_time / queries * 1000:.2f} ms/query)")
+
+    if size <= 20000:
+        duplicates, sweep_time = timed(index.find_duplicates, 0.9)
+        print(f"  dedupe sweep              {sweep_time * 1000:10.1f} ms ({len(duplicates)} pairs)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--baseline-queries', type=int, default=3)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.queries, args.baseline_queries)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Concurrent token transfer stress test: many threads move tokens between a
+small set of users, then the run checks that no balance went negative,
+that the total supply is unchanged and that every balance matches its
+ledger entries.
+
+Requires a MongoDB server; uses MONGODB_URI and a throwaway database.
+Transactions need a replica set; pass --no-transactions for a standalone
+mongod.
+
+Usage:
+    MONGODB_URI=mongodb://localhost:27017/?replicaSet=rs0 \\
+        python -m benchmarks.token_transfer_stress --threads 32 --transfers 500
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from collections import Counter
+from pymongo import MongoClient
+import db_indexes
+from token_ledger import TokenLedger
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--transfers', type=int, default=500, help='transfers per thread')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--balance', type=int, default=100, help='starting balance per user')
+    parser.add_argument('--no-transactions', action='store_true')
+    parser.add_argument('--database', default='votechain_transfer_stress')
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    db = client[args.database]
+    try:
+        users = [f'stress-user-{i}' for i in range(args.users)]
+        db.users.insert_many([{'_id': user, 'governance_tokens': args.balance} for user in users])
+        ledger = TokenLedger(db.users, db.token_ledger, use_transactions=not args.no_transactions)
+        db_indexes.ensure_indexes(db, 'tokens')
+
+        statuses = Counter()
+        statuses_lock = threading.Lock()
+        barrier = threading.Barrier(args.threads + 1)
+
+        def worker(seed: int):
+            rng = random.Random(seed)
+            local = Counter()
+            barrier.wait()
+            for _ in range(args.transfers):
+                sender, recipient = rng.sample(users, 2)
+                # Amounts large enough that many transfers must be refused
+                local[ledger.transfer(sender, recipient, rng.randint(1, args.balance))] += 1
+            with statuses_lock:
+                statuses.update(local)
+
+        workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        balances = {user['_id']: user['governance_tokens'] for user in db.users.find()}
+        ledger_sums = Counter()
+        for entry in db.token_ledger.find({}, {'user_id': 1, 'amount': 1}):
+            ledger_sums[entry['user_id']] += entry['amount']
+
+        overdrawn = [user for user, balance in balances.items() if balance < 0]
+        mismatched = [user for user in users if balances[user] != args.balance + ledger_sums[user]]
+        total = sum(balances.values())
+
+        attempts = args.threads * args.transfers
+        print(f"{attempts} transfers in {elapsed:.2f}s: {attempts / elapsed:,.0f} transfers/sec "
+              f"({statuses['transferred']} completed, {statuses['insufficient_funds']} refused)")
+        print(f"overdrawn users: {len(overdrawn)}, ledger mismatches: {len(mismatched)}, "
+              f"total supply {total} (expected {args.users * args.balance})")
+        assert not overdrawn and not mismatched and total == args.users * args.balance
+    finally:
+        client.drop_database(args.database)
+
+if __name__ == '__main__':
+    main()
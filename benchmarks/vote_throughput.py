@@ -0,0 +1,59 @@
+"""
+Vote write throughput on a single hot proposal: one $inc per vote
+(immediate mode) against coalesced bulk flushes (buffered mode).
+
+Requires a MongoDB server; uses MONGODB_URI and a throwaway database.
+
+Usage:
+    MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.vote_throughput --threads 32 --votes 2000
+"""
+import argparse
+import os
+import threading
+import time
+from pymongo import MongoClient
+from vote_tally import VoteTallyBuffer
+
+def run(collection, mode: str, threads: int, votes_per_thread: int) -> float:
+    proposal_id = collection.insert_one({'title': f'benchmark {mode}', 'votes': {}}).inserted_id
+    tally = VoteTallyBuffer(collection, mode=mode)
+    barrier = threading.Barrier(threads + 1)
+
+    def voter(index: int):
+        barrier.wait()
+        for i in range(votes_per_thread):
+            tally.record(proposal_id, 'for' if (index + i) % 2 else 'against')
+
+    workers = [threading.Thread(target=voter, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    tally.stop()
+    elapsed = time.perf_counter() - start
+
+    expected = threads * votes_per_thread
+    stored = collection.find_one({'_id': proposal_id})['votes']['total_participants']
+    assert stored == expected, f"{mode}: stored {stored} votes, expected {expected}"
+    return expected / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--votes', type=int, default=2000, help='votes per thread')
+    parser.add_argument('--database', default='votechain_benchmark')
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv('MONGODB_URI', 'mongodb://localhost:27017'))
+    collection = client[args.database].proposals
+    try:
+        for mode in ('immediate', 'buffered'):
+            rate = run(collection, mode, args.threads, args.votes)
+            print(f"{mode:<10} {rate:12,.0f} votes/sec ({args.threads} threads, one proposal)")
+    finally:
+        client.drop_database(args.database)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import hashlib
+from typing import Callable, Any
+from flask import request, make_response, Response
+from pymongo import UpdateOne
+
+class ResourceVersions:
+    """
+    Per-resource version counters, bumped by the write paths and read by
+    conditional GETs instead of recomputing the resource
+    """
+    def __init__(self, collection):
+        self.versions = collection
+
+    def bump(self, *keys: str):
+        """
+        Mark resources as changed
+        """
+        if not keys:
+            return
+        try:
+            self.versions.bulk_write(self.bump_operations(*keys), ordered=False)
+        except Exception as e:
+            # A missed bump only makes a cached copy look fresh until the next one
+            print(f"Resource version bump error: {e}")
+
+    @staticmethod
+    def bump_operations(*keys: str) -> list:
+        """
+        Bulk write operations that bump the given resources
+        """
+        return [UpdateOne({'_id': key}, {'$inc': {'version': 1}}, upsert=True) for key in keys]
+
+    def get(self, key: str) -> int:
+        document = self.versions.find_one({'_id': key}, {'version': 1})
+        return document['version'] if document else 0
+
+    def etag(self, key: str, *parts: Any) -> str:
+        """
+        Entity tag for a view of a resource, e.g. one page or filter of it
+        """
+        return self.make_etag(key, self.get(key), *parts)
+
+    @staticmethod
+    def make_etag(key: str, version: int, *parts: Any) -> str:
+        raw = ':'.join([key, str(version)] + [str(part) for part in parts])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def conditional_response(etag: str, build: Callable[[], Any], cache_control: str = 'private, no-cache') -> Response:
+    """
+    Answer 304 when the client already has this version, otherwise build
+    the full response
+
+    Args:
+        etag (str): Entity tag of the current version
+        build (Callable): Returns the full response (a Response or a view return value)
+        cache_control (str): Cache-Control header for successful responses
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
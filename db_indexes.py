@@ -0,0 +1,197 @@
+"""
+Index declarations and query-plan checks for every service
+
+Each service ensures its indexes at startup with ensure_indexes(). The
+checker runs explain() on the queries each service issues and fails if
+any of them plans a collection scan:
+
+    python db_indexes.py check [--service auth] [--ensure]
+    python db_indexes.py ensure [--service auth]
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Any, Iterator
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+
+# service -> collection -> indexes
+INDEXES = {
+    'proposals': {
+        'votes': [
+            IndexModel([('proposal_id', ASCENDING), ('voter_address', ASCENDING)],
+                       unique=True, name='proposal_voter_unique'),
+            # Proposals voted on in a window, for counter reconciliation
+            IndexModel([('created_at', ASCENDING)], name='votes_created_at')
+        ],
+        'vote_rollups': [
+            IndexModel([('scope', ASCENDING), ('granularity', ASCENDING),
+                        ('proposal_id', ASCENDING), ('bucket', ASCENDING)],
+                       name='rollup_series')
+        ]
+    },
+    'auth': {
+        'users': [
+            IndexModel([('email', ASCENDING)], unique=True, name='users_email_unique')
+        ]
+    },
+    'tokens': {
+        'token_ledger': [
+            IndexModel([('user_id', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+                       name='user_timestamp_id')
+        ],
+        'users': [
+            # Voter address -> user, for snapshot vote weights
+            IndexModel([('wallet_address', ASCENDING)], name='users_wallet_address', sparse=True)
+        ],
+        'balance_checkpoints': [
+            IndexModel([('user_id', ASCENDING), ('timestamp', DESCENDING)], name='user_timestamp')
+        ],
+        'token_airdrop_recipients': [
+            IndexModel([('airdrop_id', ASCENDING), ('user_id', ASCENDING)], name='airdrop_user')
+        ]
+    },
+    'notifications': {
+        'notifications': [
+            IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)], name='user_created_at')
+        ],
+        'users': [
+            # Each branch of the fan-out $or needs its own index
+            IndexModel([('interested_proposals', ASCENDING)], name='users_interested_proposals'),
+            IndexModel([('governance_notifications', ASCENDING)], name='users_governance_notifications',
+                       partialFilterExpression={'governance_notifications': True})
+        ]
+    },
+    'audit': {
+        'audit_logs': [
+            IndexModel([('user_id', ASCENDING), ('timestamp', DESCENDING)], name='user_timestamp')
+        ]
+    }
+}
+
+def _sample_id() -> str:
+    return str(ObjectId())
+
+# service -> (description, collection, filter, sort) for every known read path
+QUERIES = {
+    'proposals': [
+        ('proposal page', 'proposals', {'_id': {'$gt': ObjectId()}}, [('_id', ASCENDING)]),
+        ('ledger tally', 'votes', {'proposal_id': ObjectId()}, None),
+        ('votes in reconcile window', 'votes', {'created_at': {'$gt': datetime(2024, 1, 1)}}, None),
+        ('vote rollup series', 'vote_rollups',
+         {'scope': 'global', 'granularity': 'hour', 'proposal_id': None,
+          'bucket': {'$gte': datetime(2024, 1, 1), '$lt': datetime(2024, 2, 1)}},
+         [('bucket', ASCENDING)])
+    ],
+    'auth': [
+        ('login by email', 'users', {'email': 'member@example.com'}, None),
+        ('profile by id', 'users', {'_id': _sample_id()}, None)
+    ],
+    'tokens': [
+        ('balance by id', 'users', {'_id': _sample_id()}, None),
+        ('ledger history page', 'token_ledger',
+         {'user_id': _sample_id(), 'timestamp': {'$gte': datetime(2024, 1, 1)}, 'type': {'$in': ['signup']}},
+         [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+        ('users by wallet', 'users', {'wallet_address': {'$in': ['0x0000000000000000000000000000000000000000']}}, None),
+        ('latest balance checkpoint', 'balance_checkpoints',
+         {'user_id': _sample_id(), 'timestamp': {'$lte': datetime(2024, 1, 1)}}, [('timestamp', DESCENDING)]),
+        ('airdrop recipients page', 'token_airdrop_recipients',
+         {'airdrop_id': _sample_id(), 'user_id': {'$gt': _sample_id()}}, [('user_id', ASCENDING)])
+    ],
+    'notifications': [
+        ('user notifications', 'notifications', {'user_id': _sample_id()}, [('created_at', DESCENDING)]),
+        ('unread notifications', 'notifications', {'user_id': _sample_id(), 'is_read': False}, None),
+        ('fan-out recipients', 'users',
+         {'$or': [{'interested_proposals': _sample_id()}, {'governance_notifications': True}]}, None)
+    ],
+    'audit': [
+        ('user audit trail', 'audit_logs',
+         {'user_id': _sample_id(), 'timestamp': {'$gte': datetime(2024, 1, 1)}},
+         [('timestamp', DESCENDING)])
+    ]
+}
+
+def ensure_indexes(db, service: str) -> List[str]:
+    """
+    Create a service's indexes if they do not exist
+
+    Args:
+        db: Mongo database
+        service (str): Key of INDEXES
+
+    Returns:
+        Names of the ensured indexes
+    """
+    names = []
+    for collection, indexes in INDEXES[service].items():
+        try:
+            names.extend(db[collection].create_indexes(indexes))
+        except Exception as e:
+            print(f"Index creation error on {collection}: {e}")
+    return names
+
+def _plan_stages(plan: Dict[str, Any]) -> Iterator[str]:
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        yield plan['stage']
+    for key in ('inputStage', 'queryPlan', 'thenStage', 'elseStage'):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        yield from _plan_stages(child)
+
+def check_query_plans(db, service: str) -> List[dict]:
+    """
+    Explain every known query of a service
+
+    Returns:
+        One dict per query with its winning plan stages and whether it
+        scans the whole collection
+    """
+    results = []
+    for description, collection, query, sort in QUERIES[service]:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()['queryPlanner']['winningPlan']
+        stages = list(_plan_stages(winning_plan))
+        results.append({
+            'service': service,
+            'query': description,
+            'collection': collection,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages
+        })
+    return results
+
+def main() -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['check', 'ensure'])
+    parser.add_argument('--service', choices=sorted(INDEXES), action='append',
+                        help='Limit to a service (repeatable, default: all)')
+    parser.add_argument('--ensure', action='store_true', help='Ensure indexes before checking')
+    args = parser.parse_args()
+
+    db = MongoClient(os.getenv('MONGODB_URI')).get_default_database()
+    services = args.service or sorted(INDEXES)
+
+    if args.command == 'ensure' or args.ensure:
+        for service in services:
+            print(f"{service}: {', '.join(ensure_indexes(db, service)) or 'no indexes'}")
+        if args.command == 'ensure':
+            return 0
+
+    failed = False
+    for service in services:
+        for result in check_query_plans(db, service):
+            status = 'COLLSCAN' if result['collscan'] else 'ok'
+            print(f"{status:<9} {service:<14} {result['query']:<24} {' > '.join(result['stages'])}")
+            failed = failed or result['collscan']
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from periodic import PeriodicTask
+
+class GovernanceStats:
+    """
+    Materialized governance analytics kept current by atomic deltas from the
+    write paths, with periodic reconciliation against the proposals
+
+    The stats document is created by the first reconciliation; deltas only
+    adjust an existing document. Every delta bumps `seq`, and a
+    reconciliation is only stored if `seq` did not move while it ran, so
+    it never overwrites deltas applied in the meantime.
+    """
+    STATS_ID = 'governance'
+
+    def __init__(self, stats_collection, proposals_collection):
+        self.stats = stats_collection
+        self.proposals = proposals_collection
+        self._reconciler = None
+
+    def apply_delta(self, proposals: int = 0, votes: int = 0, ai_prediction: float = None):
+        """
+        Atomically adjust the stored counters, once they have been bootstrapped
+        """
+        update = self.delta_update(proposals, votes, ai_prediction)
+        if update is not None:
+            self.stats.update_one({'_id': self.STATS_ID}, update)
+
+    @staticmethod
+    def delta_update(proposals: int = 0, votes: int = 0, ai_prediction: float = None):
+        """
+        Update document for a counter delta, or None if there is nothing to change
+        """
+        increments = {}
+        if proposals:
+            increments['total_proposals'] = proposals
+        if votes:
+            increments['total_votes'] = votes
+        if ai_prediction is not None:
+            increments['ai_prediction_sum'] = ai_prediction
+            increments['ai_prediction_count'] = 1
+        if not increments:
+            return None
+        increments['seq'] = 1
+        return {'$inc': increments, '$set': {'updated_at': datetime.utcnow()}}
+
+    def read(self) -> dict:
+        """
+        Current analytics, in the shape of the original aggregation result
+        """
+        document = self.stats.find_one({'_id': self.STATS_ID})
+        if not self.is_bootstrapped(document):
+            document = self.reconcile()
+        return self.summarize(document)
+
+    @staticmethod
+    def is_bootstrapped(document: dict) -> bool:
+        """
+        Whether a stats document holds full totals rather than deltas alone
+        """
+        return document is not None and 'reconciled_at' in document
+
+    @staticmethod
+    def summarize(document: dict) -> dict:
+        count = document.get('ai_prediction_count', 0)
+        return {
+            '_id': None,
+            'total_proposals': document.get('total_proposals', 0),
+            'avg_ai_prediction': document.get('ai_prediction_sum', 0) / count if count else None,
+            'total_votes': document.get('total_votes', 0)
+        }
+
+    def reconcile(self, attempts: int = 3) -> dict:
+        """
+        Recompute the counters from the proposals collection, correcting drift
+
+        Args:
+            attempts (int): Recomputations to try while deltas keep arriving
+
+        Returns:
+            The recomputed counters, whether or not they could be stored
+        """
+        for _ in range(attempts):
+            current = self.stats.find_one({'_id': self.STATS_ID}, {'seq': 1})
+            document = self._recompute()
+            if current is None:
+                try:
+                    self.stats.insert_one({'_id': self.STATS_ID, 'seq': 0, **document})
+                    return document
+                except DuplicateKeyError:
+                    continue
+            # A missing seq (documents written before it existed) matches None
+            result = self.stats.update_one(
+                {'_id': self.STATS_ID, 'seq': current.get('seq')},
+                {'$set': document}
+            )
+            if result.matched_count:
+                return document
+
+        print("Governance stats reconciliation skipped: counters changed during every attempt")
+        return document
+
+    def _recompute(self) -> dict:
+        totals = next(self.proposals.aggregate([
+            {
+                '$group': {
+                    '_id': None,
+                    'total_proposals': {'$sum': 1},
+                    'ai_prediction_sum': {'$sum': '$ai_prediction.success_probability'},
+                    'ai_prediction_count': {'$sum': {
+                        '$cond': [{'$isNumber': '$ai_prediction.success_probability'}, 1, 0]
+                    }},
+                    'total_votes': {'$sum': '$votes.total_participants'}
+                }
+            }
+        ]), {})
+
+        return {
+            'total_proposals': totals.get('total_proposals', 0),
+            'ai_prediction_sum': totals.get('ai_prediction_sum', 0),
+            'ai_prediction_count': totals.get('ai_prediction_count', 0),
+            'total_votes': totals.get('total_votes', 0),
+            'updated_at': datetime.utcnow(),
+            'reconciled_at': datetime.utcnow()
+        }
+
+    def start_reconciler(self, interval: float):
+        """
+        Reconcile now, which bootstraps the counters, then every interval
+        seconds on a background thread
+        """
+        if self._reconciler is None:
+            self._reconciler = PeriodicTask(self.reconcile, interval, 'stats-reconciler', run_on_start=True)
+        self._reconciler.start()
+
+    def stop(self):
+        if self._reconciler is not None:
+            self._reconciler.stop()
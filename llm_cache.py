@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+class LLMResponseCache:
+    """
+    Content-addressed cache for model completions
+
+    Entries live in an in-memory LRU tier and, when a Mongo collection is
+    attached, in a persistent tier shared across processes.
+    """
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, collection=None):
+        """
+        Args:
+            max_entries (int): Maximum number of entries kept in memory
+            ttl_seconds (float): Lifetime of an entry in both tiers
+            collection: Optional Mongo collection for the persistent tier
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.collection = collection
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'persistent_hits': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], **params: Any) -> str:
+        """
+        Hash a completion request into a cache key
+
+        Args:
+            model (str): Model name
+            messages (List[Dict]): Chat messages
+            **params: Sampling parameters (temperature, max_tokens, response_format, ...)
+
+        Returns:
+            Hex SHA-256 digest of the canonical request
+        """
+        payload = json.dumps(
+            {'model': model, 'messages': messages, 'params': params},
+            sort_keys=True,
+            separators=(',', ':'),
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def attach_collection(self, collection):
+        """
+        Enable the persistent tier, expiring documents through a TTL index
+        """
+        collection.create_index('expires_at', expireAfterSeconds=0)
+        self.collection = collection
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response, promoting persistent hits into memory
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+        value = self._get_persistent(key)
+        with self._lock:
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['persistent_hits'] += 1
+            self._store(key, value, now)
+        return value
+
+    def set(self, key: str, value: str):
+        """
+        Store a response in every tier
+        """
+        with self._lock:
+            self._store(key, value, time.monotonic())
+
+        if self.collection is not None:
+            try:
+                self.collection.update_one(
+                    {'_id': key},
+                    {'$set': {
+                        'response': value,
+                        'expires_at': datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+                    }},
+                    upsert=True
+                )
+            except Exception as e:
+                print(f"LLM cache write error: {e}")
+
+    def delete(self, key: str):
+        """
+        Drop a response from every tier, e.g. one the caller could not use
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if self.collection is not None:
+            try:
+                self.collection.delete_one({'_id': key})
+            except Exception as e:
+                print(f"LLM cache delete error: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and current memory tier size
+        """
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0
+            }
+
+    def _store(self, key: str, value: str, now: float):
+        self._entries[key] = (value, now + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _get_persistent(self, key: str) -> Optional[str]:
+        if self.collection is None:
+            return None
+        try:
+            document = self.collection.find_one(
+                {'_id': key, 'expires_at': {'$gt': datetime.utcnow()}},
+                {'response': 1}
+            )
+            return document['response'] if document else None
+        except Exception as e:
+            print(f"LLM cache read error: {e}")
+            return None
+
+class CachedModelClient:
+    """
+    Model client wrapper that serves repeated requests from an LLMResponseCache
+    """
+    def __init__(self, client, cache: LLMResponseCache):
+        self.client = client
+        self.cache = cache
+
+    def complete(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        key = self.cache.make_key(model, messages, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = self.client.complete(model=model, messages=messages, **kwargs)
+        self.cache.set(key, response)
+        return response
+
+    def evict(self, model: str, messages: List[Dict[str, str]], **kwargs: Any):
+        """
+        Forget the cached response to a request, so the next call asks the model again
+        """
+        self.cache.delete(self.cache.make_key(model, messages, **kwargs))
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        key = self.cache.make_key(model, messages, **kwargs)
+        cached = await self._off_loop(self.cache.get, key)
+        if cached is not None:
+            return cached
+
+        response = await self.client.acomplete(model=model, messages=messages, **kwargs)
+        await self._off_loop(self.cache.set, key, response)
+        return response
+
+    async def _off_loop(self, method, *args):
+        # The persistent tier is blocking pymongo; keep it off the event loop
+        if self.cache.collection is None:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List, Any
+import openai
+from llm_cache import LLMResponseCache, CachedModelClient
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+class OpenAIModelClient:
+    """
+    Thin wrapper around the OpenAI chat completion API
+    """
+    def complete(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        """
+        Run a chat completion and return the message content
+
+        Args:
+            model (str): Model name
+            messages (List[Dict]): Chat messages
+            **kwargs: Extra completion arguments (temperature, max_tokens, ...)
+
+        Returns:
+            Content of the first completion choice
+        """
+        response = openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            **kwargs
+        )
+        return response.choices[0].message.content
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        """
+        Async chat completion, for use from an event loop
+        """
+        response = await openai.ChatCompletion.acreate(
+            model=model,
+            messages=messages,
+            **kwargs
+        )
+        return response.choices[0].message.content
+
+class FakeModelClient:
+    """
+    In-process stand-in for the model API, used for offline runs and tests
+    """
+    def __init__(self,
+                 response: str = 'Success Probability: 0.75\nReasoning: Clear and well-scoped proposal.',
+                 latency: float = 0.0,
+                 failures: int = 0):
+        """
+        Args:
+            response (str): Content returned for every completion
+            latency (float): Seconds to sleep before answering
+            failures (int): Number of initial calls that raise before succeeding
+        """
+        self.response = response
+        self.latency = latency
+        self.failures = failures
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record_call(self, model: str, messages: List[Dict[str, str]], kwargs: dict) -> bool:
+        with self._lock:
+            self.calls.append({'model': model, 'messages': messages, **kwargs})
+            should_fail = self.failures > 0
+            if should_fail:
+                self.failures -= 1
+        return should_fail
+
+    def complete(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        should_fail = self._record_call(model, messages, kwargs)
+
+        if self.latency:
+            time.sleep(self.latency)
+        if should_fail:
+            raise RuntimeError('Fake model failure')
+        return self.response
+
+    async def acomplete(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        should_fail = self._record_call(model, messages, kwargs)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if should_fail:
+            raise RuntimeError('Fake model failure')
+        return self.response
+
+def get_shared_cache() -> LLMResponseCache:
+    """
+    Process-wide completion cache shared by all AI modules
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache(
+                max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1024)),
+                ttl_seconds=float(os.getenv('LLM_CACHE_TTL_SECONDS', 86400))
+            )
+        return _shared_cache
+
+def get_model_client():
+    """
+    Build the model client selected by the AI_MODEL_CLIENT environment variable,
+    wrapped in the shared cache unless LLM_CACHE=off
+    """
+    if os.getenv('AI_MODEL_CLIENT', 'openai').lower() == 'fake':
+        client = FakeModelClient()
+    else:
+        client = OpenAIModelClient()
+
+    if os.getenv('LLM_CACHE', 'on').lower() == 'off':
+        return client
+    return CachedModelClient(client, get_shared_cache())
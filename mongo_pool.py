@@ -0,0 +1,96 @@
+import os
+import threading
+from pymongo import MongoClient
+
+def _int_env(name: str, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+class SharedMongo:
+    """
+    One process-wide Mongo client shared by every service
+
+    The client is created on first use, so services imported into the same
+    process (see service_host.py) share a single connection pool. Pool size,
+    timeouts and read preference come from the environment:
+
+        MONGODB_URI                       connection string, including the database
+        MONGO_MAX_POOL_SIZE               connections per server (default 100)
+        MONGO_MIN_POOL_SIZE               connections kept open when idle (default 0)
+        MONGO_MAX_IDLE_TIME_MS            idle connection lifetime (default 60000)
+        MONGO_WAIT_QUEUE_TIMEOUT_MS       wait for a free connection (default 5000)
+        MONGO_SERVER_SELECTION_TIMEOUT_MS server selection timeout (default 5000)
+        MONGO_CONNECT_TIMEOUT_MS          connect timeout (default 5000)
+        MONGO_SOCKET_TIMEOUT_MS           per-operation socket timeout (default none)
+        MONGO_READ_PREFERENCE             e.g. primaryPreferred (default primary)
+    """
+    def __init__(self):
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def client_options() -> dict:
+        """
+        MongoClient keyword arguments built from the environment
+        """
+        return {
+            'maxPoolSize': _int_env('MONGO_MAX_POOL_SIZE', 100),
+            'minPoolSize': _int_env('MONGO_MIN_POOL_SIZE', 0),
+            'maxIdleTimeMS': _int_env('MONGO_MAX_IDLE_TIME_MS', 60000),
+            'waitQueueTimeoutMS': _int_env('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000),
+            'serverSelectionTimeoutMS': _int_env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000),
+            'connectTimeoutMS': _int_env('MONGO_CONNECT_TIMEOUT_MS', 5000),
+            'socketTimeoutMS': _int_env('MONGO_SOCKET_TIMEOUT_MS'),
+            'readPreference': os.getenv('MONGO_READ_PREFERENCE', 'primary'),
+            'retryWrites': True
+        }
+
+    @property
+    def cx(self) -> MongoClient:
+        """
+        The shared client, created on first access
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = MongoClient(os.getenv('MONGODB_URI'), **self.client_options())
+        return self._client
+
+    @property
+    def db(self):
+        """
+        Database named in MONGODB_URI
+        """
+        return self.cx.get_default_database()
+
+    @property
+    def async_cx(self):
+        """
+        Shared motor client for the ASGI app, created on first access
+
+        Motor binds the client to the event loop it is first used on, so
+        access it only from the serving loop (asgi_app.py creates its
+        users in a before_serving hook), never at import time.
+        """
+        if self._async_client is None:
+            # Optional dependency, only needed by asgi_app.py
+            from motor.motor_asyncio import AsyncIOMotorClient
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = AsyncIOMotorClient(os.getenv('MONGODB_URI'), **self.client_options())
+        return self._async_client
+
+    @property
+    def async_db(self):
+        return self.async_cx.get_default_database()
+
+    def close(self):
+        with self._lock:
+            for client in (self._client, self._async_client):
+                if client is not None:
+                    client.close()
+            self._client = None
+            self._async_client = None
+
+mongo = SharedMongo()
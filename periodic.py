@@ -0,0 +1,74 @@
+import atexit
+import threading
+from typing import Callable, Optional
+
+class PeriodicTask:
+    """
+    Runs a function every `interval` seconds on a daemon thread
+
+    Used by the write buffers (vote tally, rollups) and the reconciliation
+    jobs. The thread starts on the first start() call and stop() is
+    registered with atexit, so buffered writes are flushed on shutdown.
+    """
+    def __init__(self,
+                 func: Callable[[], object],
+                 interval: float,
+                 name: str,
+                 run_on_stop: bool = False,
+                 run_on_start: bool = False):
+        """
+        Args:
+            func (Callable): Work to run; exceptions are printed and the schedule continues
+            interval (float): Seconds between runs
+            name (str): Thread name, also used in error messages
+            run_on_stop (bool): Run func once more after the thread stops,
+                e.g. to flush what is still buffered
+            run_on_start (bool): Run func as soon as the thread starts
+                instead of after the first interval
+        """
+        self.func = func
+        self.interval = interval
+        self.name = name
+        self.run_on_stop = run_on_stop
+        self.run_on_start = run_on_start
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """
+        Start the thread unless it is already running
+        """
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop the thread, waiting for a run in progress, then run once more if run_on_stop
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        if self.run_on_stop:
+            self._run_once()
+
+    def _run_once(self):
+        try:
+            self.func()
+        except Exception as e:
+            print(f"{self.name} error: {e}")
+
+    def _run(self):
+        if self.run_on_start and not self._stop.is_set():
+            self._run_once()
+        while not self._stop.wait(self.interval):
+            self._run_once()
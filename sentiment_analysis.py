@@ -1,109 +1,192 @@
-import openai
-import json
-from typing import Dict, List
-
-class ProposalSentimentAnalyzer:
-    def __init__(self, api_key: str):
-        """
-        Initialize OpenAI client for sentiment analysis
-        """
-        openai.api_key = api_key
-
-    def analyze_proposal_sentiment(self, proposal_text: str) -> Dict[str, float]:
-        """
-        Perform comprehensive sentiment analysis on a proposal
-        
-        Args:
-            proposal_text (str): Full text of the proposal to analyze
-        
-        Returns:
-            Dict containing sentiment scores
-        """
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": """You are an advanced sentiment analysis AI 
-                        specialized in evaluating governance proposals. 
-                        Provide detailed sentiment analysis with numeric scores."""
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"""Perform a comprehensive sentiment analysis 
-                        on the following proposal text. Provide scores from -1 (very negative) 
-                        to 1 (very positive) for the following dimensions:
-                        1. Overall Sentiment
-                        2. Potential Impact
-                        3. Innovation Level
-                        4. Clarity of Proposal
-                        5. Community Alignment
-
-                        Proposal Text:
-                        {proposal_text}
-
-                        Response Format:
-                        {{
-                            "overall_sentiment": float,
-                            "potential_impact": float,
-                            "innovation_level": float,
-                            "clarity": float,
-                            "community_alignment": float,
-                            "detailed_analysis": str
-                        }}"""
-                    }
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.6,
-                max_tokens=300
-            )
-            
-            # Parse the JSON response
-            analysis = json.loads(response.choices[0].message.content)
-            return analysis
-        
-        except Exception as e:
-            print(f"Sentiment Analysis Error: {e}")
-            return {
-                "overall_sentiment": 0,
-                "potential_impact": 0,
-                "innovation_level": 0,
-                "clarity": 0,
-                "community_alignment": 0,
-                "detailed_analysis": "Analysis failed"
-            }
-
-    def batch_analyze_proposals(self, proposals: List[str]) -> List[Dict[str, float]]:
-        """
-        Analyze multiple proposals in batch
-        
-        Args:
-            proposals (List[str]): List of proposal texts
-        
-        Returns:
-            List of sentiment analysis results
-        """
-        return [self.analyze_proposal_sentiment(proposal) for proposal in proposals]
-
-def main():
-    # Example usage
-    import os
-    from dotenv import load_dotenv
-    
-    load_dotenv()
-    
-    analyzer = ProposalSentimentAnalyzer(os.getenv('OPENAI_API_KEY'))
-    
-    sample_proposal = """
-    We propose implementing a new governance mechanism 
-    that increases transparency and reduces decision-making time 
-    by 40% through the use of advanced blockchain technologies 
-    and AI-powered analytics.
-    """
-    
-    result = analyzer.analyze_proposal_sentiment(sample_proposal)
-    print(json.dumps(result, indent=2))
-
-if __name__ == "__main__":
-    main()
+import openai
+import json
+from typing import Dict, List, Iterable, Iterator, Optional
+from model_client import get_model_client
+from batch_engine import BatchRunner
+
+class ProposalSentimentAnalyzer:
+    def __init__(self, api_key: str, model_client=None):
+        """
+        Initialize OpenAI client for sentiment analysis
+        """
+        openai.api_key = api_key
+        self.model_client = model_client or get_model_client()
+
+    def analyze_proposal_sentiment(self, proposal_text: str) -> Dict[str, float]:
+        """
+        Perform comprehensive sentiment analysis on a proposal
+        
+        Args:
+            proposal_text (str): Full text of the proposal to analyze
+        
+        Returns:
+            Dict containing sentiment scores
+        """
+        try:
+            return self._request_sentiment(proposal_text)
+        except Exception as e:
+            print(f"Sentiment Analysis Error: {e}")
+            return self._fallback_analysis()
+
+    def _request_sentiment(self, proposal_text: str) -> Dict[str, float]:
+        """
+        Request a sentiment analysis from the model, raising on failure
+        """
+        request = dict(
+            model="gpt-3.5-turbo",
+            messages=[
+                {
+                    "role": "system", 
+                    "content": """You are an advanced sentiment analysis AI 
+                    specialized in evaluating governance proposals. 
+                    Provide detailed sentiment analysis with numeric scores."""
+                },
+                {
+                    "role": "user", 
+                    "content": f"""Perform a comprehensive sentiment analysis 
+                    on the following proposal text. Provide scores from -1 (very negative) 
+                    to 1 (very positive) for the following dimensions:
+                    1. Overall Sentiment
+                    2. Potential Impact
+                    3. Innovation Level
+                    4. Clarity of Proposal
+                    5. Community Alignment
+
+                    Proposal Text:
+                    {proposal_text}
+
+                    Response Format:
+                    {{
+                        "overall_sentiment": float,
+                        "potential_impact": float,
+                        "innovation_level": float,
+                        "clarity": float,
+                        "community_alignment": float,
+                        "detailed_analysis": str
+                    }}"""
+                }
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.6,
+            max_tokens=300
+        )
+        
+        content = self.model_client.complete(**request)
+        
+        # Parse the JSON response
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            # Otherwise every retry would replay the same cached malformed text
+            if hasattr(self.model_client, 'evict'):
+                self.model_client.evict(**request)
+            raise
+
+    @staticmethod
+    def _fallback_analysis() -> Dict[str, float]:
+        """
+        Neutral scores used when analysis fails
+        """
+        return {
+            "overall_sentiment": 0,
+            "potential_impact": 0,
+            "innovation_level": 0,
+            "clarity": 0,
+            "community_alignment": 0,
+            "detailed_analysis": "Analysis failed"
+        }
+
+    def batch_analyze_proposals(self,
+                                proposals: List[str],
+                                max_concurrency: int = 8,
+                                rate_per_second: Optional[float] = None,
+                                max_retries: int = 3) -> List[Dict[str, float]]:
+        """
+        Analyze multiple proposals concurrently
+        
+        Args:
+            proposals (List[str]): List of proposal texts
+            max_concurrency (int): Maximum number of concurrent model calls
+            rate_per_second (float, optional): Model call rate limit
+            max_retries (int): Retries per proposal before giving up
+        
+        Returns:
+            List of sentiment analysis results in input order; proposals that
+            still failed after retrying get the neutral fallback scores
+        """
+        return self.batch_analyze_proposals_report(
+            proposals, max_concurrency, rate_per_second, max_retries
+        )['results']
+
+    def batch_analyze_proposals_report(self,
+                                       proposals: List[str],
+                                       max_concurrency: int = 8,
+                                       rate_per_second: Optional[float] = None,
+                                       max_retries: int = 3) -> dict:
+        """
+        Same as batch_analyze_proposals, also reporting which proposals failed
+        
+        Returns:
+            Dict with the results list, the failures (index, error, attempts)
+            and success/failure counts
+        """
+        runner = BatchRunner(max_concurrency, rate_per_second, max_retries)
+        report = runner.run(self._request_sentiment, proposals)
+
+        for failure in report['failures']:
+            print(f"Sentiment Analysis Error for proposal {failure['index']}: {failure['error']}")
+
+        return {
+            'results': [
+                result if result is not None else self._fallback_analysis()
+                for result in report['results']
+            ],
+            'failures': [
+                {key: failure[key] for key in ('index', 'error', 'attempts')}
+                for failure in report['failures']
+            ],
+            'succeeded': report['succeeded'],
+            'failed': report['failed']
+        }
+
+    def stream_analyze_proposals(self,
+                                 proposals: Iterable[str],
+                                 max_concurrency: int = 8,
+                                 rate_per_second: Optional[float] = None,
+                                 max_retries: int = 3) -> Iterator[dict]:
+        """
+        Analyze proposals concurrently, yielding each result as it finishes
+        
+        Args:
+            proposals (Iterable[str]): Proposal texts
+            max_concurrency (int): Maximum number of concurrent model calls
+            rate_per_second (float, optional): Model call rate limit
+            max_retries (int): Retries per proposal before giving up
+        
+        Returns:
+            Iterator of dicts with index, success, result, error and attempts
+        """
+        runner = BatchRunner(max_concurrency, rate_per_second, max_retries)
+        return runner.stream(self._request_sentiment, proposals)
+
+def main():
+    # Example usage
+    import os
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    
+    analyzer = ProposalSentimentAnalyzer(os.getenv('OPENAI_API_KEY'))
+    
+    sample_proposal = """
+    We propose implementing a new governance mechanism 
+    that increases transparency and reduces decision-making time 
+    by 40% through the use of advanced blockchain technologies 
+    and AI-powered analytics.
+    """
+    
+    result = analyzer.analyze_proposal_sentiment(sample_proposal)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
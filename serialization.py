@@ -0,0 +1,87 @@
+import json
+import uuid
+from datetime import datetime, date
+from decimal import Decimal
+from typing import Any, Iterable, Iterator
+from bson import ObjectId
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pure-Python fallback
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    """
+    Convert types the JSON encoders do not handle natively
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Serialize to UTF-8 JSON bytes, handling ObjectId, datetime and UUID
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def dumps(obj: Any) -> str:
+    """
+    Serialize to a JSON string, handling ObjectId, datetime and UUID
+    """
+    return dumps_bytes(obj).decode('utf-8')
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def iter_json_array(items: Iterable[Any]) -> Iterator[bytes]:
+    """
+    Stream an iterable as a JSON array, one element per chunk
+    """
+    yield b'['
+    first = True
+    for item in items:
+        if not first:
+            yield b','
+        yield dumps_bytes(item)
+        first = False
+    yield b']'
+
+class MongoJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson when installed, with native
+    ObjectId, datetime and UUID support
+    """
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            # Explicit json.dumps options (indent, sort_keys, ...) need the stdlib encoder
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj)
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b'\n', mimetype='application/json')
+
+def init_app(app):
+    """
+    Install the shared JSON provider on a Flask app
+    """
+    app.json = MongoJSONProvider(app)
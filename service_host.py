@@ -0,0 +1,71 @@
+"""
+Single-process host for every backend service
+
+Each service module defines a blueprint and still builds its own app for
+standalone use (python auth_service.py, port 5001, ...). This host mounts
+all of them on one Flask app, so the services share one process, one set
+of imports and one Mongo connection pool (see mongo_pool.py):
+
+    python service_host.py
+    gunicorn 'service_host:create_host_app()'
+
+Building the host app also starts the services' background jobs (AI
+scoring resubmission, airdrop resumption, balance checkpoints). Set
+BACKGROUND_JOBS=false on processes that should only serve requests, e.g.
+all but one of several hosts.
+"""
+import os
+from flask import Flask
+from flask_cors import CORS
+from dotenv import load_dotenv
+import serialization
+
+# Load environment variables
+load_dotenv()
+
+def create_app(import_name: str, *blueprints) -> Flask:
+    """
+    Flask app serving the given blueprints with the shared JSON provider
+
+    Args:
+        import_name (str): Name passed to Flask
+        *blueprints: Service blueprints to register
+
+    Returns:
+        Configured Flask app
+    """
+    app = Flask(import_name)
+    CORS(app)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    serialization.init_app(app)
+    for blueprint in blueprints:
+        app.register_blueprint(blueprint)
+    return app
+
+def create_host_app() -> Flask:
+    """
+    One app mounting the proposal, auth, token, notification and audit services
+    """
+    # Imported here: the service modules import create_app from this module
+    import app as proposals_service
+    import auth_service
+    import token_management
+    import notifications
+    import audit
+
+    host_app = create_app(
+        __name__,
+        proposals_service.bp,
+        auth_service.bp,
+        token_management.bp,
+        notifications.bp,
+        audit.bp
+    )
+    if os.getenv('BACKGROUND_JOBS', 'true').lower() == 'true':
+        proposals_service.start_background_jobs()
+        token_management.start_background_jobs()
+    return host_app
+
+if __name__ == '__main__':
+    host_app = create_host_app()
+    host_app.run(debug=True, port=int(os.getenv('SERVICE_HOST_PORT', 5000)))
@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+def recover_signer(message: str, signature: str) -> Optional[str]:
+    """
+    Recover the address that signed a personal_sign (EIP-191) message
+
+    Returns:
+        Lower-cased signer address, or None if the signature is malformed
+    """
+    try:
+        return Account.recover_message(encode_defunct(text=message), signature=signature).lower()
+    except Exception:
+        return None
+
+def _recover_chunk(pairs: List[Tuple[str, str]]) -> List[Optional[str]]:
+    # Runs in worker processes, so it must stay a module-level function
+    return [recover_signer(message, signature) for message, signature in pairs]
+
+class SignatureVerifier:
+    """
+    Vote signature verification with a bounded LRU of recovered signers and
+    process-pool batch verification
+    """
+    def __init__(self, cache_size: int = 10000, max_workers: int = None, min_parallel_batch: int = 64):
+        """
+        Args:
+            cache_size (int): Maximum number of memoized (message, signature) pairs
+            max_workers (int, optional): Worker processes for batches, defaults to CPU count
+            min_parallel_batch (int): Batches with fewer cache misses are verified inline
+        """
+        self.cache_size = cache_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_parallel_batch = min_parallel_batch
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._metrics = {
+            'verifications': 0,
+            'cache_hits': 0,
+            'recoveries': 0,
+            'recover_seconds': 0.0,
+            'batches': 0
+        }
+
+    def recover(self, message: str, signature: str) -> Optional[str]:
+        """
+        Recover the signer of a message, using the cache when possible
+        """
+        key = (message, signature)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._metrics['cache_hits'] += 1
+                return self._cache[key]
+
+        start = time.perf_counter()
+        signer = recover_signer(message, signature)
+        self._record_recoveries([(key, signer)], time.perf_counter() - start)
+        return signer
+
+    def verify(self, vote_data: Dict[str, Any]) -> bool:
+        """
+        Check that a vote was signed by its voter_address
+        """
+        with self._lock:
+            self._metrics['verifications'] += 1
+        try:
+            signer = self.recover(vote_data['message'], vote_data['signature'])
+            return signer is not None and signer == vote_data['voter_address'].lower()
+        except Exception as e:
+            print(f"Signature validation error: {e}")
+            return False
+
+    def verify_batch(self, votes: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Verify many votes, recovering cache misses in worker processes
+
+        Returns:
+            Per-vote validity in input order
+        """
+        signers = [None] * len(votes)
+        misses = {}
+        with self._lock:
+            self._metrics['verifications'] += len(votes)
+            self._metrics['batches'] += 1
+            for index, vote in enumerate(votes):
+                try:
+                    key = (vote['message'], vote['signature'])
+                except (KeyError, TypeError):
+                    continue
+                # Lists or objects from a JSON body are unhashable and never valid
+                if not isinstance(key[0], str) or not isinstance(key[1], str):
+                    continue
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    self._metrics['cache_hits'] += 1
+                    signers[index] = self._cache[key]
+                else:
+                    misses.setdefault(key, []).append(index)
+
+        if misses:
+            keys = list(misses)
+            start = time.perf_counter()
+            recovered = self._recover_many(keys)
+            self._record_recoveries(list(zip(keys, recovered)), time.perf_counter() - start)
+            for key, signer in zip(keys, recovered):
+                for index in misses[key]:
+                    signers[index] = signer
+
+        return [
+            signer is not None and signer == str(vote.get('voter_address', '')).lower()
+            for vote, signer in zip(votes, signers)
+        ]
+
+    def metrics(self) -> dict:
+        """
+        Verification counters and recovery timings
+        """
+        with self._lock:
+            recoveries = self._metrics['recoveries']
+            return {
+                **self._metrics,
+                'cache_size': len(self._cache),
+                'avg_recover_ms': self._metrics['recover_seconds'] / recoveries * 1000 if recoveries else 0.0
+            }
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Workers are spawned, not forked: forking a process that runs request
+        # and flusher threads can copy locks held by those threads. Spawned
+        # workers re-import the __main__ script as __mp_main__, so a script
+        # that starts this pool must keep its setup out of that import
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def _recover_many(self, keys: List[Tuple[str, str]]) -> List[Optional[str]]:
+        if len(keys) < self.min_parallel_batch or self.max_workers == 1:
+            return _recover_chunk(keys)
+
+        pool = self._get_pool()
+        chunk_size = -(-len(keys) // self.max_workers)
+        chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+        results = []
+        for chunk_result in pool.map(_recover_chunk, chunks):
+            results.extend(chunk_result)
+        return results
+
+    def _record_recoveries(self, recovered: List[Tuple[Tuple[str, str], Optional[str]]], seconds: float):
+        with self._lock:
+            self._metrics['recoveries'] += len(recovered)
+            self._metrics['recover_seconds'] += seconds
+            for key, signer in recovered:
+                self._cache[key] = signer
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -0,0 +1,453 @@
+import hashlib
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+import numpy as np
+import scipy.sparse as sp
+from bson import json_util
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+# Upper bound on dense score cells materialized per chunk (~64 MB of float64)
+MAX_SCORE_CELLS = 2 ** 23
+
+def top_k_rows(scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the top_k columns of every row of a dense score matrix
+
+    Uses argpartition, so only the selected columns are sorted.
+
+    Returns:
+        Column indices and scores, each of shape (rows, top_k), best first
+    """
+    top_k = min(top_k, scores.shape[1])
+    if top_k == 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty
+
+    if top_k < scores.shape[1]:
+        candidates = np.argpartition(scores, -top_k, axis=1)[:, -top_k:]
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+    order = np.argsort(-candidate_scores, axis=1, kind='stable')
+    return (np.take_along_axis(candidates, order, axis=1),
+            np.take_along_axis(candidate_scores, order, axis=1))
+
+class _GrowableRows:
+    """
+    Append-only CSR storage with spare capacity
+
+    Appending rows writes into preallocated arrays (doubled when full), so
+    rows already stored are not copied again; matrix() is a view.
+    """
+    def __init__(self, n_features: int, capacity: int = 1024):
+        self.n_features = n_features
+        self.n_rows = 0
+        self.data = np.empty(capacity, dtype=np.float64)
+        self.indices = np.empty(capacity, dtype=np.int32)
+        self.indptr = np.zeros(capacity + 1, dtype=np.int32)
+
+    @classmethod
+    def from_matrix(cls, matrix: sp.csr_matrix) -> '_GrowableRows':
+        rows = cls(matrix.shape[1], capacity=max(1024, matrix.nnz, matrix.shape[0]))
+        rows.append(matrix)
+        return rows
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[self.n_rows])
+
+    @staticmethod
+    def _grow(array: np.ndarray, needed: int, used: int) -> np.ndarray:
+        if needed <= len(array):
+            return array
+        grown = np.empty(max(needed, 2 * len(array)), dtype=array.dtype)
+        grown[:used] = array[:used]
+        return grown
+
+    def append(self, block: sp.csr_matrix):
+        block = block.tocsr()
+        nnz, n_rows = self.nnz, self.n_rows
+        self.data = self._grow(self.data, nnz + block.nnz, nnz)
+        self.indices = self._grow(self.indices, nnz + block.nnz, nnz)
+        self.indptr = self._grow(self.indptr, n_rows + block.shape[0] + 1, n_rows + 1)
+
+        self.data[nnz:nnz + block.nnz] = block.data
+        self.indices[nnz:nnz + block.nnz] = block.indices
+        self.indptr[n_rows + 1:n_rows + block.shape[0] + 1] = block.indptr[1:] + nnz
+        self.n_rows += block.shape[0]
+
+    def clear_row(self, row: int) -> np.ndarray:
+        """
+        Zero a row in place
+
+        Returns:
+            Columns the row had non-zero values in
+        """
+        start, end = self.indptr[row], self.indptr[row + 1]
+        columns = self.indices[start:end][self.data[start:end] != 0].copy()
+        self.data[start:end] = 0
+        return columns
+
+    def matrix(self) -> sp.csr_matrix:
+        nnz = self.nnz
+        return sp.csr_matrix(
+            (self.data[:nnz], self.indices[:nnz], self.indptr[:self.n_rows + 1]),
+            shape=(self.n_rows, self.n_features),
+            copy=False
+        )
+
+class ProposalSimilarityIndex:
+    """
+    Incrementally maintained TF-IDF index over proposals
+
+    Term counts come from a stateless hashing vectorizer, so adding a
+    proposal or transforming a query never refits over the corpus. Document
+    frequencies are kept as running totals. New rows are weighted with the
+    IDF the corpus matrix was last built with and appended to it; the whole
+    corpus is reweighted only once the IDF has drifted by more than
+    reweight_threshold.
+
+    Proposals are keyed by _id. Re-adding a key replaces its entry, and
+    removed entries keep their position but no longer match anything.
+
+    An approximate nearest-neighbour backend (see ann_index) can be attached
+    for corpora too large for exact search. It is refit whenever the corpus
+    is reweighted, so its vectors never lag the IDF by more than
+    reweight_threshold.
+    """
+    def __init__(self, n_features: int = 2 ** 18, backend=None, reweight_threshold: float = 0.02):
+        """
+        Args:
+            n_features (int): Number of hashed term buckets
+            backend (optional): Approximate search backend, e.g. ann_index.IVFBackend
+            reweight_threshold (float): Relative change of the corpus term
+                weights that triggers a full reweight
+        """
+        self.n_features = n_features
+        self.backend = backend
+        self.reweight_threshold = reweight_threshold
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            stop_words='english',
+            alternate_sign=False,
+            norm=None
+        )
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.proposals = []
+        self.positions = {}
+        self._digests = {}
+        self._removed = set()
+        self._counts = _GrowableRows(n_features)
+        self._weighted = None
+        self._weight_idf = None
+        # Bumped on every full reweight, so dependants know to rebuild
+        self.weights_version = 0
+        self._backend_version = None
+
+    def __len__(self) -> int:
+        return len(self.proposals) - len(self._removed)
+
+    @staticmethod
+    def proposal_text(proposal: Dict[str, Any]) -> str:
+        """
+        Text used to index a proposal (title and description)
+        """
+        return f"{proposal.get('title', '')} {proposal.get('description', '')}"
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def proposal_key(cls, proposal: Dict[str, Any]) -> str:
+        """
+        Identity of a proposal in the index: its _id, or a hash of its text
+        """
+        if proposal.get('_id') is not None:
+            return str(proposal['_id'])
+        return cls._digest(cls.proposal_text(proposal))
+
+    def add(self, proposals: List[Dict[str, Any]]) -> List[int]:
+        """
+        Add proposals to the index, replacing entries with the same key
+
+        Returns:
+            Index positions of the given proposals, in input order
+        """
+        if not proposals:
+            return []
+
+        # A key given more than once is indexed once, with its last version
+        latest = {self.proposal_key(proposal): proposal for proposal in proposals}
+        for key in latest:
+            self._clear(key)
+
+        unique = list(latest.values())
+        texts = [self.proposal_text(p) for p in unique]
+        counts = self.vectorizer.transform(texts).tocsr()
+        self.doc_freq += np.bincount(counts.indices, minlength=self.n_features)
+        self._counts.append(counts)
+
+        start = len(self.proposals)
+        for offset, (key, proposal, text) in enumerate(zip(latest, unique, texts)):
+            self.positions[key] = start + offset
+            self._digests[key] = self._digest(text)
+            self.proposals.append(proposal)
+
+        if self._weighted is not None:
+            if self._idf_drift() > self.reweight_threshold:
+                self._weighted = None
+            else:
+                self._weighted.append(normalize(counts.multiply(self._weight_idf).tocsr()))
+        return [self.positions[self.proposal_key(proposal)] for proposal in proposals]
+
+    def update(self, proposal: Dict[str, Any]) -> int:
+        """
+        Re-index an edited proposal
+
+        Returns:
+            Its new index position
+        """
+        return self.add([proposal])[0]
+
+    def remove(self, proposal_or_key: Union[Dict[str, Any], str]) -> bool:
+        """
+        Drop a proposal from search results
+
+        Returns:
+            False if it was not indexed
+        """
+        key = proposal_or_key if isinstance(proposal_or_key, str) else self.proposal_key(proposal_or_key)
+        if not self._clear(key):
+            return False
+        if self._weighted is not None and self._idf_drift() > self.reweight_threshold:
+            self._weighted = None
+        return True
+
+    def _clear(self, key: str) -> bool:
+        """
+        Zero a key's row and forget it, keeping its position as a tombstone
+        """
+        position = self.positions.pop(key, None)
+        if position is None:
+            return False
+        self._digests.pop(key, None)
+        columns = self._counts.clear_row(position)
+        self.doc_freq[columns] -= 1
+        if self._weighted is not None:
+            self._weighted.clear_row(position)
+        self.proposals[position] = None
+        self._removed.add(position)
+        return True
+
+    def add_missing(self, proposals: List[Dict[str, Any]]) -> List[int]:
+        """
+        Add the proposals not indexed yet, and re-index ones whose text changed
+
+        Returns:
+            Index positions of every given proposal, in input order
+        """
+        missing = []
+        seen = set()
+        for proposal in proposals:
+            key = self.proposal_key(proposal)
+            if key in seen:
+                continue
+            if key not in self.positions or self._digests.get(key) != self._digest(self.proposal_text(proposal)):
+                missing.append(proposal)
+                seen.add(key)
+        self.add(missing)
+        return [self.positions[self.proposal_key(proposal)] for proposal in proposals]
+
+    def idf(self) -> np.ndarray:
+        """
+        Smoothed inverse document frequencies, as computed by TfidfVectorizer
+        """
+        return np.log((1 + len(self)) / (1 + self.doc_freq)) + 1
+
+    def _idf_drift(self) -> float:
+        """
+        Relative change of the corpus term weights since the last full reweight
+        """
+        baseline = float(np.dot(self.doc_freq, self._weight_idf))
+        if not baseline:
+            return 0.0
+        return float(np.dot(self.doc_freq, np.abs(self.idf() - self._weight_idf))) / baseline
+
+    def transform(self, proposals: List[Dict[str, Any]]) -> sp.csr_matrix:
+        """
+        L2-normalized TF-IDF vectors for proposals, weighted like the corpus
+        """
+        self.corpus_matrix()
+        counts = self.vectorizer.transform([self.proposal_text(p) for p in proposals])
+        return normalize(counts.multiply(self._weight_idf).tocsr())
+
+    def corpus_matrix(self) -> sp.csr_matrix:
+        """
+        L2-normalized TF-IDF matrix of the indexed proposals (removed ones are zero rows)
+        """
+        if self._weighted is None:
+            self._weight_idf = self.idf()
+            self._weighted = _GrowableRows.from_matrix(
+                normalize(self._counts.matrix().multiply(self._weight_idf).tocsr())
+            )
+            self.weights_version += 1
+        return self._weighted.matrix()
+
+    def _mask_removed(self, indices: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Drop removed positions from top_k results, keeping the best first
+        """
+        if not self._removed or indices.size == 0:
+            return indices, scores
+        removed = np.isin(indices, np.fromiter(self._removed, dtype=np.int64))
+        scores = np.where(removed, -np.inf, scores)
+        order = np.argsort(-scores, axis=1, kind='stable')
+        indices = np.take_along_axis(np.where(removed, -1, indices), order, axis=1)
+        return indices, np.take_along_axis(scores, order, axis=1)
+
+    def search(self,
+               proposal: Dict[str, Any],
+               top_k: int = 5,
+               candidates: Optional[Sequence[int]] = None) -> List[int]:
+        """
+        Find the most similar indexed proposals
+
+        Args:
+            proposal (Dict): Query proposal
+            top_k (int): Number of matches to return
+            candidates (Sequence[int], optional): Restrict the search to these positions
+
+        Returns:
+            Matches in decreasing similarity, as index positions, or as offsets
+            into candidates when given
+        """
+        indices, _ = self.search_many([proposal], top_k, candidates)
+        return [i for i in indices[0].tolist() if i >= 0]
+
+    def search_many(self,
+                    queries: Union[List[Dict[str, Any]], sp.csr_matrix],
+                    top_k: int = 5,
+                    candidates: Optional[Sequence[int]] = None,
+                    exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the most similar indexed proposals for many queries at once
+
+        Scores are sparse dot products of L2-normalized vectors (cosine
+        similarity), computed in row chunks to bound memory.
+
+        Args:
+            queries: Query proposals, or a matrix from transform()
+            top_k (int): Number of matches per query
+            candidates (Sequence[int], optional): Restrict the search to these positions
+            exact (bool): Bypass the approximate backend, if any
+
+        Returns:
+            Match indices and scores, each of shape (queries, top_k), best
+            first. Missing matches (removed proposals, or too few backend
+            candidates) are padded with -1 / -inf.
+        """
+        if not sp.issparse(queries):
+            queries = self.transform(queries)
+
+        if self.backend is not None and candidates is None and not exact and len(self):
+            indices, scores = self.backend.search(queries, self._synced_backend_corpus(), top_k)
+            return self._mask_removed(indices, scores)
+
+        corpus = self.corpus_matrix()
+        removed_columns = sorted(self._removed)
+        if candidates is not None:
+            candidates = np.asarray(candidates, dtype=np.int64)
+            corpus = corpus[candidates]
+            removed_columns = np.flatnonzero(np.isin(candidates, removed_columns))
+
+        n_docs = corpus.shape[0]
+        chunk_size = max(1, MAX_SCORE_CELLS // max(1, n_docs))
+        all_indices, all_scores = [], []
+        for start in range(0, queries.shape[0], chunk_size):
+            # corpus @ query.T keeps the corpus in row layout, so nothing is transposed per add
+            scores = (corpus @ queries[start:start + chunk_size].T).T.toarray()
+            scores[:, removed_columns] = -np.inf
+            indices, top_scores = top_k_rows(scores, top_k)
+            indices[np.isneginf(top_scores)] = -1
+            all_indices.append(indices)
+            all_scores.append(top_scores)
+
+        if not all_indices:
+            k = min(top_k, n_docs)
+            return np.empty((0, k), dtype=np.int64), np.empty((0, k))
+        return np.vstack(all_indices), np.vstack(all_scores)
+
+    def _synced_backend_corpus(self) -> sp.csr_matrix:
+        """
+        Bring the backend up to date with the corpus and return the corpus
+        """
+        corpus = self.corpus_matrix()
+        # Backend vectors carry the IDF they were built with; refit after a reweight
+        if self.backend.size == 0 or self._backend_version != self.weights_version:
+            self.backend.fit(corpus)
+            self._backend_version = self.weights_version
+        elif self.backend.size < corpus.shape[0]:
+            self.backend.add(corpus[self.backend.size:])
+        return corpus
+
+    def find_duplicates(self, threshold: float = 0.9) -> List[Tuple[int, int, float]]:
+        """
+        Sweep the whole index for near-duplicate pairs
+
+        Args:
+            threshold (float): Minimum cosine similarity of a duplicate pair
+
+        Returns:
+            (position, position, similarity) tuples with the first position lower
+        """
+        corpus = self.corpus_matrix()
+        corpus_t = corpus.T.tocsr()
+        chunk_size = max(1, MAX_SCORE_CELLS // max(1, corpus.shape[0]))
+        duplicates = []
+        for start in range(0, corpus.shape[0], chunk_size):
+            scores = (corpus[start:start + chunk_size] @ corpus_t).tocoo()
+            rows = scores.row + start
+            mask = (scores.data >= threshold) & (rows < scores.col)
+            duplicates.extend(zip(rows[mask].tolist(), scores.col[mask].tolist(), scores.data[mask].tolist()))
+        return duplicates
+
+    def save(self, path: str):
+        """
+        Serialize the index to a single .npz file
+        """
+        counts = self._counts.matrix()
+        np.savez_compressed(
+            path,
+            data=counts.data,
+            indices=counts.indices,
+            indptr=counts.indptr,
+            doc_freq=self.doc_freq,
+            n_features=np.array(self.n_features),
+            proposals=np.array(json_util.dumps(self.proposals))
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'ProposalSimilarityIndex':
+        """
+        Load an index written by save()
+        """
+        with np.load(path, allow_pickle=False) as stored:
+            index = cls(n_features=int(stored['n_features']))
+            index.doc_freq = stored['doc_freq']
+            proposals = json_util.loads(str(stored['proposals']))
+            index._counts = _GrowableRows.from_matrix(sp.csr_matrix(
+                (stored['data'], stored['indices'], stored['indptr']),
+                shape=(len(proposals), index.n_features)
+            ))
+        index.proposals = proposals
+        for position, proposal in enumerate(proposals):
+            if proposal is None:
+                index._removed.add(position)
+                continue
+            key = cls.proposal_key(proposal)
+            index.positions[key] = position
+            index._digests[key] = cls._digest(cls.proposal_text(proposal))
+        return index
+
@@ -0,0 +1,159 @@
+import queue
+import threading
+from collections import defaultdict
+from typing import Dict, Any
+
+class TallyHub:
+    """
+    In-process fan-out of vote tally changes
+
+    One upstream source (the vote flusher, or a Mongo change stream)
+    publishes each change once; every subscriber of that proposal gets it
+    from its own bounded queue, so N listeners cost no extra queries.
+
+    Events carry absolute `totals`, so a client can apply them in any
+    number without double counting; `delta` is informational.
+    """
+    def __init__(self, max_queue: int = 100):
+        """
+        Args:
+            max_queue (int): Events buffered per subscriber before it is
+                told to resynchronize
+        """
+        self.max_queue = max_queue
+        self._subscribers = defaultdict(set)
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+        # Serializes read-back and publish, so versions follow the order totals were read
+        self._publish_lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def follows_change_stream(self) -> bool:
+        return self._watcher is not None
+
+    def subscribe(self, proposal_id) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers[proposal_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, proposal_id, subscriber: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(proposal_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[proposal_id]
+
+    def has_subscribers(self, proposal_id) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(proposal_id))
+
+    def version(self, proposal_id) -> int:
+        with self._lock:
+            return self._versions[proposal_id]
+
+    def publish(self, proposal_id, delta: Dict[str, Any] = None, totals: Dict[str, Any] = None) -> int:
+        """
+        Send a tally change to the proposal's subscribers
+
+        Args:
+            proposal_id: Proposal whose tally changed
+            delta (dict, optional): Counter increments, e.g. {'for': 3, 'total_participants': 3}
+            totals (dict, optional): Absolute counters, when increments are not known
+
+        Returns:
+            The proposal's new version
+        """
+        with self._lock:
+            self._versions[proposal_id] += 1
+            version = self._versions[proposal_id]
+            subscribers = list(self._subscribers.get(proposal_id, ()))
+
+        event = {'version': version, 'delta': delta, 'totals': totals}
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # A slow client missed events: drop its backlog and make it refetch
+                self._resync(subscriber, version)
+        return version
+
+    def publish_increments(self, increments: Dict[Any, Dict[str, int]], proposals_collection):
+        """
+        Publish VoteTallyBuffer increments ({proposal_id: {'votes.<field>': n}})
+        once they are written, each with the proposal's counters read back
+
+        Args:
+            increments (dict): Increments just applied
+            proposals_collection: Mongo collection holding the counters; only
+                proposals with subscribers are read
+        """
+        with self._publish_lock:
+            subscribed = [proposal_id for proposal_id in increments if self.has_subscribers(proposal_id)]
+            totals = {}
+            if subscribed:
+                totals = {
+                    proposal['_id']: proposal.get('votes', {})
+                    for proposal in proposals_collection.find({'_id': {'$in': subscribed}}, {'votes': 1})
+                }
+            for proposal_id, fields in increments.items():
+                self.publish(
+                    proposal_id,
+                    delta={field.split('.', 1)[1]: count for field, count in fields.items()},
+                    totals=totals.get(proposal_id)
+                )
+
+    def follow_change_stream(self, proposals_collection):
+        """
+        Publish vote counter changes seen on a Mongo change stream, so
+        votes flushed by other processes reach this process's subscribers.
+        Requires a replica set.
+        """
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch,
+            args=(proposals_collection,),
+            name='tally-change-stream',
+            daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self, proposals_collection):
+        pipeline = [{'$match': {'operationType': 'update'}}]
+        while True:
+            try:
+                with proposals_collection.watch(pipeline) as stream:
+                    for change in stream:
+                        updated = change.get('updateDescription', {}).get('updatedFields', {})
+                        totals = {
+                            field.split('.', 1)[1]: value
+                            for field, value in updated.items() if field.startswith('votes.')
+                        }
+                        if 'votes' in updated:
+                            totals.update(updated['votes'])
+                        if totals:
+                            self.publish(change['documentKey']['_id'], totals=totals)
+            except Exception as e:
+                print(f"Tally change stream error: {e}")
+                threading.Event().wait(5)
+
+    def _resync(self, subscriber: queue.Queue, version: int):
+        # Another publisher can refill the queue between drain and put
+        while True:
+            self._drain(subscriber)
+            try:
+                subscriber.put_nowait({'version': version, 'resync': True})
+                return
+            except queue.Full:
+                continue
+
+    @staticmethod
+    def _drain(subscriber: queue.Queue):
+        while True:
+            try:
+                subscriber.get_nowait()
+            except queue.Empty:
+                return
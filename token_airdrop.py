@@ -0,0 +1,401 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Any, Iterator, Optional
+from pymongo import UpdateOne, ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+from token_ledger import TokenLedger, DUPLICATE_KEY_ERROR
+
+# Operators that would run server-side code or compare fields from a client query
+FORBIDDEN_QUERY_OPERATORS = {'$where', '$function', '$accumulator', '$expr'}
+
+# Statuses an airdrop can be (re)started from
+RUNNABLE_STATUSES = ['pending', 'running', 'failed']
+
+class LeaseLost(Exception):
+    """
+    Raised when another process has taken over an airdrop; aborts the
+    current chunk's transaction
+    """
+
+class AirdropEngine:
+    """
+    Credits one allocation to many users in chunked, unordered bulk writes
+
+    An airdrop is identified by its airdrop_id. Each credited user gets the
+    ledger entry '<airdrop_id>:<user_id>', so a user is credited at most once
+    per airdrop however often the job is retried. Progress is checkpointed
+    in the airdrops collection after every chunk, and an interrupted airdrop
+    resumes after the last completed chunk.
+
+    Explicit recipient lists are stored one user per document in the
+    recipients collection, so an airdrop's size is not bounded by the
+    16 MB document limit. Both lists and queries are walked in user id order.
+
+    A process runs an airdrop only while it holds the airdrop's lease,
+    claimed atomically and renewed with every checkpoint, so several
+    processes resuming incomplete airdrops never work on the same one.
+
+    With transactions, each chunk's ledger entries, balance updates and
+    checkpoint commit together. Without them, a crash between a chunk's
+    ledger insert and its balance update leaves those users under-credited
+    until TokenLedger.reconcile_balance() is run for them.
+    """
+    def __init__(self,
+                 token_ledger: TokenLedger,
+                 airdrops_collection,
+                 recipients_collection,
+                 chunk_size: int = 1000,
+                 max_workers: int = 2,
+                 lease_seconds: float = 300.0,
+                 on_credited: Callable[[List[Any]], None] = None):
+        """
+        Args:
+            token_ledger (TokenLedger): Ledger and balances to credit
+            airdrops_collection: Mongo collection for airdrop checkpoints
+            recipients_collection: Mongo collection for explicit recipient lists
+            chunk_size (int): Users per bulk write
+            max_workers (int): Airdrops processed concurrently
+            lease_seconds (float): How long a claim lasts without a checkpoint;
+                must exceed the time one chunk takes
+            on_credited (Callable, optional): Called with the user ids
+                credited by each chunk
+        """
+        self.token_ledger = token_ledger
+        self.airdrops = airdrops_collection
+        self.recipients = recipients_collection
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.on_credited = on_credited
+        # Lease owner id of this engine
+        self.owner = uuid.uuid4().hex
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='airdrop')
+        self._running = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def validate_query(query: Any):
+        """
+        Reject user queries that are not documents or that run server-side code
+        """
+        if not isinstance(query, dict):
+            raise ValueError('query must be a document')
+
+        def check(value):
+            if isinstance(value, dict):
+                for key, nested in value.items():
+                    if key in FORBIDDEN_QUERY_OPERATORS:
+                        raise ValueError(f"Operator not allowed in airdrop query: {key}")
+                    check(nested)
+            elif isinstance(value, list):
+                for nested in value:
+                    check(nested)
+
+        check(query)
+
+    def start(self,
+              airdrop_id: str,
+              allocation_type: str,
+              amount: int,
+              user_ids: Optional[List[Any]] = None,
+              query: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Create an airdrop, or resume an existing one, in the background
+
+        The definition of an existing airdrop_id is kept, so a resumed
+        airdrop cannot change its recipients or amount. An airdrop whose
+        recipient list was only partly stored (status 'preparing') stays
+        unrun until it is started again.
+
+        Returns:
+            Current progress document
+        """
+        if (user_ids is None) == (query is None):
+            raise ValueError('Provide exactly one of user_ids or query')
+        if query is not None:
+            self.validate_query(query)
+        if not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+            raise ValueError(f"Invalid airdrop amount: {amount!r}")
+
+        now = datetime.utcnow()
+        unique_user_ids = list(dict.fromkeys(user_ids)) if user_ids is not None else None
+        airdrop = self.airdrops.find_one_and_update(
+            {'_id': airdrop_id},
+            {'$setOnInsert': {
+                'allocation_type': allocation_type,
+                'amount': amount,
+                'source': 'list' if user_ids is not None else 'query',
+                'query': query,
+                'status': 'preparing' if user_ids is not None else 'pending',
+                'last_user_id': None,
+                'processed': 0,
+                'credited': 0,
+                'already_credited': 0,
+                'missing_users': 0,
+                'total': len(unique_user_ids) if user_ids is not None else None,
+                'created_at': now,
+                'updated_at': now
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if airdrop['status'] == 'preparing' and user_ids is not None:
+            self._store_recipients(airdrop_id, unique_user_ids)
+            self.airdrops.update_one(
+                {'_id': airdrop_id, 'status': 'preparing'},
+                {'$set': {'status': 'pending', 'updated_at': datetime.utcnow()}}
+            )
+        self.submit(airdrop_id)
+        return self.progress(airdrop_id)
+
+    def _store_recipients(self, airdrop_id: str, user_ids: List[Any]):
+        """
+        Insert an airdrop's recipient list in chunks; recipients stored by an
+        earlier, interrupted call fail on their _id and are skipped
+        """
+        for start in range(0, len(user_ids), self.chunk_size):
+            documents = [
+                {'_id': f"{airdrop_id}:{user_id}", 'airdrop_id': airdrop_id, 'user_id': user_id}
+                for user_id in user_ids[start:start + self.chunk_size]
+            ]
+            try:
+                self.recipients.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                if any(error['code'] != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                    raise
+
+    def submit(self, airdrop_id: str) -> Optional[Future]:
+        """
+        Queue an airdrop unless it is already running in this process
+        """
+        with self._lock:
+            if airdrop_id in self._running:
+                return self._running[airdrop_id]
+            future = self.executor.submit(self._run_safely, airdrop_id)
+            self._running[airdrop_id] = future
+            return future
+
+    def resume_incomplete(self) -> int:
+        """
+        Re-queue airdrops left pending or running, e.g. by a restart
+
+        Returns:
+            Number of airdrops queued
+        """
+        count = 0
+        # Airdrops leased by a live process are skipped when run() tries to claim them
+        for airdrop in self.airdrops.find({'status': {'$in': ['pending', 'running']}}, {'_id': 1}):
+            self.submit(airdrop['_id'])
+            count += 1
+        return count
+
+    def progress(self, airdrop_id: str) -> Optional[dict]:
+        """
+        Progress of an airdrop, without its lease
+        """
+        return self.airdrops.find_one({'_id': airdrop_id}, {'lease_owner': 0, 'lease_expires_at': 0})
+
+    def _run_safely(self, airdrop_id: str):
+        try:
+            self.run(airdrop_id)
+        except LeaseLost:
+            print(f"Airdrop {airdrop_id} was taken over by another process")
+        except Exception as e:
+            print(f"Airdrop {airdrop_id} failed: {e}")
+            self.airdrops.update_one(
+                {'_id': airdrop_id, 'lease_owner': self.owner},
+                {'$set': {'status': 'failed', 'error': str(e), 'updated_at': datetime.utcnow()},
+                 '$unset': {'lease_owner': '', 'lease_expires_at': ''}}
+            )
+        finally:
+            with self._lock:
+                self._running.pop(airdrop_id, None)
+
+    def run(self, airdrop_id: str) -> dict:
+        """
+        Process an airdrop to completion in the calling thread
+
+        Returns immediately if the airdrop is completed, still preparing or
+        leased by another process.
+
+        Returns:
+            Final progress document
+
+        Raises:
+            LeaseLost: If another process took the airdrop over mid-run
+        """
+        airdrop = self._claim(airdrop_id)
+        if airdrop is None:
+            if self.airdrops.count_documents({'_id': airdrop_id}, limit=1) == 0:
+                raise ValueError(f"Unknown airdrop: {airdrop_id}")
+            return self.progress(airdrop_id)
+
+        if airdrop['source'] == 'query' and airdrop['total'] is None:
+            total = self.token_ledger.users.count_documents(airdrop['query'])
+            self.airdrops.update_one({'_id': airdrop_id}, {'$set': {'total': total}})
+
+        for chunk in self._chunks(airdrop):
+            self._apply_chunk(airdrop, chunk)
+
+        now = datetime.utcnow()
+        self.airdrops.update_one(
+            {'_id': airdrop_id, 'lease_owner': self.owner},
+            {'$set': {'status': 'completed', 'completed_at': now, 'updated_at': now},
+             '$unset': {'lease_owner': '', 'lease_expires_at': ''}}
+        )
+        return self.progress(airdrop_id)
+
+    def _claim(self, airdrop_id: str) -> Optional[dict]:
+        """
+        Take the airdrop's lease if it is runnable and unleased, expired or
+        already ours
+
+        Returns:
+            The claimed airdrop, or None
+        """
+        now = datetime.utcnow()
+        return self.airdrops.find_one_and_update(
+            {
+                '_id': airdrop_id,
+                'status': {'$in': RUNNABLE_STATUSES},
+                '$or': [
+                    {'lease_expires_at': None},
+                    {'lease_expires_at': {'$lt': now}},
+                    {'lease_owner': self.owner}
+                ]
+            },
+            {
+                '$set': {
+                    'status': 'running',
+                    'lease_owner': self.owner,
+                    'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+                    'updated_at': now
+                },
+                '$unset': {'error': ''}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _chunks(self, airdrop: dict) -> Iterator[List[Any]]:
+        """
+        Remaining recipients, chunk by chunk, starting after the checkpoint
+        """
+        # Keyset pagination in user id order, over the stored list or the query
+        last_user_id = airdrop['last_user_id']
+        while True:
+            if airdrop['source'] == 'list':
+                query = {'airdrop_id': airdrop['_id']}
+                if last_user_id is not None:
+                    query['user_id'] = {'$gt': last_user_id}
+                chunk = [
+                    recipient['user_id']
+                    for recipient in self.recipients.find(query, {'user_id': 1})
+                        .sort('user_id', ASCENDING)
+                        .limit(self.chunk_size)
+                ]
+            else:
+                query = airdrop['query']
+                if last_user_id is not None:
+                    query = {'$and': [airdrop['query'], {'_id': {'$gt': last_user_id}}]}
+                chunk = [
+                    user['_id']
+                    for user in self.token_ledger.users.find(query, {'_id': 1})
+                        .sort('_id', ASCENDING)
+                        .limit(self.chunk_size)
+                ]
+            if not chunk:
+                return
+            yield chunk
+            last_user_id = chunk[-1]
+
+    def _apply_chunk(self, airdrop: dict, user_ids: List[Any]):
+        if not self.token_ledger.use_transactions:
+            credited = self._write_chunk(airdrop, user_ids, session=None)
+        else:
+            with self.token_ledger.users.database.client.start_session() as session:
+                credited = session.with_transaction(lambda s: self._write_chunk(airdrop, user_ids, session=s))
+
+        if credited and self.on_credited is not None:
+            try:
+                self.on_credited(credited)
+            except Exception as e:
+                print(f"Airdrop callback error for {airdrop['_id']}: {e}")
+
+    def _write_chunk(self, airdrop: dict, user_ids: List[Any], session=None) -> List[Any]:
+        """
+        Ledger entries, balance updates and checkpoint for one chunk
+
+        Returns:
+            User ids credited by this chunk
+        """
+        missing = 0
+        if airdrop['source'] == 'list':
+            # Explicit recipient lists may name users that do not exist
+            existing = {
+                user['_id']
+                for user in self.token_ledger.users.find({'_id': {'$in': user_ids}}, {'_id': 1}, session=session)
+            }
+            missing = len(user_ids) - len(existing)
+            recipients = [user_id for user_id in user_ids if user_id in existing]
+        else:
+            recipients = user_ids
+
+        # Users credited by an earlier attempt already have this airdrop's entry.
+        # They are filtered out up front, because inside a transaction the
+        # first duplicate key error would abort the whole chunk.
+        entry_ids = {f"{airdrop['_id']}:{user_id}": user_id for user_id in recipients}
+        already_credited = {
+            entry_ids[entry['_id']]
+            for entry in self.token_ledger.ledger.find({'_id': {'$in': list(entry_ids)}}, {'_id': 1}, session=session)
+        }
+        recipients = [user_id for user_id in recipients if user_id not in already_credited]
+
+        timestamp = datetime.utcnow()
+        entries = []
+        for user_id in recipients:
+            entry = TokenLedger.entry(user_id, airdrop['allocation_type'], airdrop['amount'], timestamp,
+                                      airdrop_id=airdrop['_id'])
+            entry['_id'] = f"{airdrop['_id']}:{user_id}"
+            entries.append(entry)
+
+        # Without transactions, a process whose lease expired mid-chunk can
+        # still race us; its entries fail on the deterministic _id
+        raced = set()
+        try:
+            if entries:
+                self.token_ledger.ledger.insert_many(entries, ordered=False, session=session)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                if error['code'] != DUPLICATE_KEY_ERROR:
+                    raise
+                raced.add(error['index'])
+
+        credited = [user_id for index, user_id in enumerate(recipients) if index not in raced]
+        if credited:
+            self.token_ledger.users.bulk_write([
+                UpdateOne({'_id': user_id}, {'$inc': {'governance_tokens': airdrop['amount']}})
+                for user_id in credited
+            ], ordered=False, session=session)
+
+        now = datetime.utcnow()
+        checkpoint = self.airdrops.update_one(
+            {'_id': airdrop['_id'], 'lease_owner': self.owner},
+            {'$inc': {
+                'processed': len(user_ids),
+                'credited': len(credited),
+                'already_credited': len(already_credited) + len(raced),
+                'missing_users': missing
+            }, '$set': {
+                'last_user_id': user_ids[-1],
+                'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+                'updated_at': now
+            }},
+            session=session
+        )
+        if checkpoint.matched_count == 0:
+            raise LeaseLost(airdrop['_id'])
+        return credited
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
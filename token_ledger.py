@@ -0,0 +1,323 @@
+"""
+Append-only governance token ledger
+
+Every balance change is a document in the token_ledger collection, indexed
+by (user_id, timestamp). The user document only keeps the denormalized
+governance_tokens counter, so user reads stay constant-size.
+
+Migrate users that still carry an embedded token_history array with:
+
+    python token_ledger.py migrate [--batch-size 500]
+"""
+import argparse
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from pymongo import DESCENDING
+from pymongo.errors import BulkWriteError
+
+DUPLICATE_KEY_ERROR = 11000
+
+class UnknownRecipient(Exception):
+    """
+    Raised inside a transfer transaction to abort it
+    """
+
+class TokenLedger:
+    """
+    Ledger entries plus the denormalized balance on each user document
+    """
+    def __init__(self, users_collection, ledger_collection, use_transactions: Optional[bool] = None):
+        """
+        Args:
+            users_collection: Mongo collection holding the balances
+            ledger_collection: Mongo collection for ledger entries
+            use_transactions (bool, optional): Run credits and transfers in a
+                multi-document transaction (requires a replica set or
+                mongos); otherwise failed writes are compensated. None
+                detects support from the server on first use
+        """
+        self.users = users_collection
+        self.ledger = ledger_collection
+        self._use_transactions = use_transactions
+
+    @property
+    def use_transactions(self) -> bool:
+        if self._use_transactions is None:
+            try:
+                hello = self.users.database.client.admin.command('isMaster')
+            except Exception as e:
+                # Not cached, so the next write checks again
+                print(f"Transaction support check failed: {e}")
+                return False
+            self._use_transactions = bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+        return self._use_transactions
+
+    @staticmethod
+    def entry(user_id, entry_type: str, amount: int, timestamp: datetime = None, **details: Any) -> dict:
+        """
+        Ledger document for one balance change
+
+        Args:
+            user_id: Owner of the balance
+            entry_type (str): e.g. 'signup', 'token_transfer_out'
+            amount (int): Signed change to the balance
+            timestamp (datetime, optional): Defaults to now
+            **details: Extra fields such as to_user / from_user
+        """
+        return {
+            '_id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'type': entry_type,
+            'amount': amount,
+            'timestamp': timestamp or datetime.utcnow(),
+            **details
+        }
+
+    @staticmethod
+    def history_item(document: dict) -> dict:
+        """
+        Ledger document in the shape of the former embedded token_history items
+        """
+        item = {key: value for key, value in document.items() if key not in ('_id', 'user_id')}
+        return {'transaction_id': document['_id'], **item}
+
+    def credit(self, user_id, amount: int, entry_type: str, session=None, **details: Any) -> bool:
+        """
+        Adjust a user's balance and append the matching ledger entry, in
+        one transaction when use_transactions is on
+
+        Args:
+            session (optional): Session of a transaction the caller already
+                runs; both writes join it
+
+        Returns:
+            False if the user does not exist
+        """
+        if session is not None:
+            return self._credit(user_id, amount, entry_type, session, **details)
+        return self._run_transaction(lambda s: self._credit(user_id, amount, entry_type, s, **details))
+
+    def _credit(self, user_id, amount: int, entry_type: str, session=None, **details: Any) -> bool:
+        result = self.users.update_one(
+            {'_id': user_id},
+            {'$inc': {'governance_tokens': amount}},
+            session=session
+        )
+        if result.matched_count == 0:
+            return False
+        try:
+            self.ledger.insert_one(self.entry(user_id, entry_type, amount, **details), session=session)
+        except Exception:
+            if session is None:
+                # No transaction to abort: take the balance change back
+                self.users.update_one({'_id': user_id}, {'$inc': {'governance_tokens': -amount}})
+            raise
+        return True
+
+    def _run_transaction(self, callback: Callable[[Any], Any]) -> Any:
+        """
+        Run callback(session) in a transaction, or with no session when
+        use_transactions is off
+        """
+        if not self.use_transactions:
+            return callback(None)
+        with self.users.database.client.start_session() as session:
+            return session.with_transaction(callback)
+
+    def transfer(self, from_user_id, to_user_id, amount: int) -> str:
+        """
+        Move tokens between users without a separate balance check
+
+        The debit only matches while the sender's balance covers the amount,
+        so concurrent transfers cannot overdraw it.
+
+        Returns:
+            'transferred', 'insufficient_funds' or 'unknown_recipient'
+        """
+        if not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+            raise ValueError(f"Invalid transfer amount: {amount!r}")
+
+        try:
+            return self._run_transaction(lambda s: self._transfer(from_user_id, to_user_id, amount, session=s))
+        except UnknownRecipient:
+            return 'unknown_recipient'
+
+    def _transfer(self, from_user_id, to_user_id, amount: int, session=None) -> str:
+        debit = self.users.update_one(
+            {'_id': from_user_id, 'governance_tokens': {'$gte': amount}},
+            {'$inc': {'governance_tokens': -amount}},
+            session=session
+        )
+        if debit.matched_count == 0:
+            return 'insufficient_funds'
+
+        credit = self.users.update_one(
+            {'_id': to_user_id},
+            {'$inc': {'governance_tokens': amount}},
+            session=session
+        )
+        if credit.matched_count == 0:
+            if session is not None:
+                # Raising aborts the transaction, undoing the debit
+                raise UnknownRecipient(to_user_id)
+            self.users.update_one({'_id': from_user_id}, {'$inc': {'governance_tokens': amount}})
+            return 'unknown_recipient'
+
+        timestamp = datetime.utcnow()
+        entries = [
+            self.entry(from_user_id, 'token_transfer_out', -amount, timestamp, to_user=to_user_id),
+            self.entry(to_user_id, 'token_transfer_in', amount, timestamp, from_user=from_user_id)
+        ]
+        try:
+            self.ledger.insert_many(entries, session=session)
+        except Exception:
+            if session is None:
+                # No transaction to abort: take both balance changes and any
+                # entry that did get written back
+                self.ledger.delete_many({'_id': {'$in': [entry['_id'] for entry in entries]}})
+                self.users.update_one({'_id': to_user_id}, {'$inc': {'governance_tokens': -amount}})
+                self.users.update_one({'_id': from_user_id}, {'$inc': {'governance_tokens': amount}})
+            raise
+        return 'transferred'
+
+    def balance(self, user_id) -> Optional[int]:
+        """
+        Current balance, or None if the user does not exist
+        """
+        user = self.users.find_one({'_id': user_id}, {'governance_tokens': 1})
+        return user.get('governance_tokens', 0) if user else None
+
+    def history(self,
+                user_id,
+                limit: int = 50,
+                cursor: Optional[str] = None,
+                start: Optional[datetime] = None,
+                end: Optional[datetime] = None,
+                types: Optional[List[str]] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of a user's ledger entries, newest first
+
+        Args:
+            user_id: Owner of the entries
+            limit (int): Page size
+            cursor (str, optional): next_cursor of the previous page
+            start (datetime, optional): Earliest timestamp, inclusive
+            end (datetime, optional): Latest timestamp, exclusive
+            types (List[str], optional): Only entries of these types
+
+        Returns:
+            Entries in the former token_history item shape, and the cursor
+            of the next page (None on the last page)
+        """
+        query = {'user_id': user_id}
+        if start is not None or end is not None:
+            query['timestamp'] = {}
+            if start is not None:
+                query['timestamp']['$gte'] = start
+            if end is not None:
+                query['timestamp']['$lt'] = end
+        if types:
+            query['type'] = {'$in': list(types)}
+        if cursor:
+            timestamp, entry_id = self.decode_cursor(cursor)
+            query = {'$and': [query, {'$or': [
+                {'timestamp': {'$lt': timestamp}},
+                {'timestamp': timestamp, '_id': {'$lt': entry_id}}
+            ]}]}
+
+        documents = list(
+            self.ledger.find(query, {'user_id': 0})
+                .sort([('timestamp', DESCENDING), ('_id', DESCENDING)])
+                .limit(limit)
+        )
+        next_cursor = None
+        if len(documents) == limit:
+            next_cursor = self.encode_cursor(documents[-1])
+        return [self.history_item(document) for document in documents], next_cursor
+
+    @staticmethod
+    def encode_cursor(document: dict) -> str:
+        return f"{document['timestamp'].isoformat()}_{document['_id']}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        """
+        Raises:
+            ValueError: If the cursor was not produced by encode_cursor
+        """
+        timestamp, separator, entry_id = cursor.partition('_')
+        if not separator or not entry_id:
+            raise ValueError(f"Invalid history cursor: {cursor!r}")
+        return datetime.fromisoformat(timestamp), entry_id
+
+    def reconcile_balance(self, user_id) -> int:
+        """
+        Overwrite a user's denormalized balance with the ledger sum
+        """
+        totals = list(self.ledger.aggregate([
+            {'$match': {'user_id': user_id}},
+            {'$group': {'_id': None, 'balance': {'$sum': '$amount'}}}
+        ]))
+        balance = totals[0]['balance'] if totals else 0
+        self.users.update_one({'_id': user_id}, {'$set': {'governance_tokens': balance}})
+        return balance
+
+    def migrate_embedded_history(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Move embedded token_history arrays into the ledger
+
+        Entries keep their transaction_id as _id, so rerunning after an
+        interruption skips what was already copied. A user's array is only
+        removed once all of its entries are in the ledger. Balances are
+        left untouched: they already include these entries.
+
+        Returns:
+            Counts of migrated users and copied entries
+        """
+        migrated = {'users': 0, 'entries': 0}
+        users = self.users.find(
+            {'token_history': {'$exists': True}},
+            {'token_history': 1}
+        ).batch_size(batch_size)
+
+        for user in users:
+            documents = []
+            for item in user.get('token_history') or []:
+                details = {key: value for key, value in item.items() if key != 'transaction_id'}
+                documents.append({
+                    '_id': item.get('transaction_id') or str(uuid.uuid4()),
+                    'user_id': user['_id'],
+                    **details
+                })
+
+            if documents:
+                try:
+                    result = self.ledger.insert_many(documents, ordered=False)
+                    migrated['entries'] += len(result.inserted_ids)
+                except BulkWriteError as e:
+                    errors = e.details.get('writeErrors', [])
+                    if any(error['code'] != DUPLICATE_KEY_ERROR for error in errors):
+                        print(f"Token history migration error for {user['_id']}: {errors[0]['errmsg']}")
+                        continue
+                    migrated['entries'] += e.details.get('nInserted', 0)
+
+            self.users.update_one({'_id': user['_id']}, {'$unset': {'token_history': ''}})
+            migrated['users'] += 1
+        return migrated
+
+def main():
+    from dotenv import load_dotenv
+    from mongo_pool import mongo
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    ledger = TokenLedger(mongo.db.users, mongo.db.token_ledger)
+    print(ledger.migrate_embedded_history(batch_size=args.batch_size))
+
+if __name__ == '__main__':
+    main()
@@ -1,213 +1,400 @@
-import os
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from flask_pymongo import PyMongo
-from dotenv import load_dotenv
-from datetime import datetime
-import uuid
-
-# Load environment variables
-load_dotenv()
-
-app = Flask(__name__)
-CORS(app)
-
-# MongoDB Configuration
-app.config['MONGO_URI'] = os.getenv('MONGODB_URI')
-
-mongo = PyMongo(app)
-
-class GovernanceTokenManager:
-    @classmethod
-    def allocate_initial_tokens(cls, user_id: str, allocation_type: str = 'signup') -> dict:
-        """
-        Allocate initial governance tokens to a user
-        """
-        allocation_rules = {
-            'signup': 100,
-            'proposal_creation': 50,
-            'successful_proposal': 200,
-            'active_voter': 25
-        }
-        
-        token_amount = allocation_rules.get(allocation_type, 0)
-        
-        try:
-            # Update user's token balance
-            result = mongo.db.users.update_one(
-                {'_id': user_id},
-                {'$inc': {'governance_tokens': token_amount},
-                 '$push': {
-                     'token_history': {
-                         'transaction_id': str(uuid.uuid4()),
-                         'type': allocation_type,
-                         'amount': token_amount,
-                         'timestamp': datetime.utcnow()
-                     }
-                 }
-                }
-            )
-            
-            return {
-                'allocated_tokens': token_amount,
-                'allocation_type': allocation_type,
-                'success': result.modified_count > 0
-            }
-        except Exception as e:
-            return {
-                'error': str(e),
-                'success': False
-            }
-    
-    @classmethod
-    def transfer_tokens(cls, from_user_id: str, to_user_id: str, amount: int) -> dict:
-        """
-        Transfer governance tokens between users
-        """
-        try:
-            # Check sender's balance
-            sender = mongo.db.users.find_one({'_id': from_user_id})
-            if not sender or sender.get('governance_tokens', 0) < amount:
-                return {
-                    'error': 'Insufficient tokens',
-                    'success': False
-                }
-            
-            # Perform token transfer
-            transfer_result = mongo.db.users.bulk_write([
-                # Deduct from sender
-                mongo.db.users.update_one(
-                    {'_id': from_user_id},
-                    {'$inc': {'governance_tokens': -amount},
-                     '$push': {
-                         'token_history': {
-                             'transaction_id': str(uuid.uuid4()),
-                             'type': 'token_transfer_out',
-                             'amount': -amount,
-                             'to_user': to_user_id,
-                             'timestamp': datetime.utcnow()
-                         }
-                     }
-                    }
-                ),
-                # Add to recipient
-                mongo.db.users.update_one(
-                    {'_id': to_user_id},
-                    {'$inc': {'governance_tokens': amount},
-                     '$push': {
-                         'token_history': {
-                             'transaction_id': str(uuid.uuid4()),
-                             'type': 'token_transfer_in',
-                             'amount': amount,
-                             'from_user': from_user_id,
-                             'timestamp': datetime.utcnow()
-                         }
-                     }
-                    }
-                )
-            ])
-            
-            return {
-                'transferred_tokens': amount,
-                'success': transfer_result.modified_count == 2
-            }
-        except Exception as e:
-            return {
-                'error': str(e),
-                'success': False
-            }
-    
-    @classmethod
-    def get_token_history(cls, user_id: str) -> dict:
-        """
-        Retrieve token transaction history for a user
-        """
-        try:
-            user = mongo.db.users.find_one({'_id': user_id})
-            if not user:
-                return {
-                    'error': 'User not found',
-                    'success': False
-                }
-            
-            return {
-                'current_balance': user.get('governance_tokens', 0),
-                'token_history': user.get('token_history', []),
-                'success': True
-            }
-        except Exception as e:
-            return {
-                'error': str(e),
-                'success': False
-            }
-
-@app.route('/api/tokens/allocate', methods=['POST'])
-def allocate_tokens():
-    """
-    Endpoint for token allocation
-    """
-    try:
-        data = request.json
-        user_id = data.get('user_id')
-        allocation_type = data.get('allocation_type', 'signup')
-        
-        if not user_id:
-            return jsonify({'error': 'User ID is required'}), 400
-        
-        result = GovernanceTokenManager.allocate_initial_tokens(user_id, allocation_type)
-        
-        if result.get('success'):
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 400
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/tokens/transfer', methods=['POST'])
-def transfer_tokens():
-    """
-    Endpoint for token transfer
-    """
-    try:
-        data = request.json
-        from_user_id = data.get('from_user_id')
-        to_user_id = data.get('to_user_id')
-        amount = data.get('amount')
-        
-        if not all([from_user_id, to_user_id, amount]):
-            return jsonify({'error': 'All fields are required'}), 400
-        
-        result = GovernanceTokenManager.transfer_tokens(from_user_id, to_user_id, amount)
-        
-        if result.get('success'):
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 400
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/tokens/history', methods=['GET'])
-def get_token_history():
-    """
-    Endpoint to retrieve token transaction history
-    """
-    try:
-        user_id = request.args.get('user_id')
-        
-        if not user_id:
-            return jsonify({'error': 'User ID is required'}), 400
-        
-        result = GovernanceTokenManager.get_token_history(user_id)
-        
-        if result.get('success'):
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 400
-    
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-if __name__ == '__main__':
-    app.run(debug=True, port=5002)
+import os
+from flask import Blueprint, request, jsonify
+from mongo_pool import mongo
+from service_host import create_app
+import db_indexes
+from conditional import ResourceVersions, conditional_response
+from token_ledger import TokenLedger
+from token_airdrop import AirdropEngine
+from balance_snapshots import BalanceSnapshots
+import uuid
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+bp = Blueprint('tokens', __name__)
+
+# Indexes behind this service's queries (see db_indexes.py)
+if os.getenv('MONGO_ENSURE_INDEXES', 'true').lower() == 'true':
+    db_indexes.ensure_indexes(mongo.db, 'tokens')
+
+resource_versions = ResourceVersions(mongo.db.resource_versions)
+
+# Token history is served newest first, one page at a time
+DEFAULT_HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+
+# Balance changes live in their own collection; users keep only the balance
+# Credits and transfers run in transactions, which need a replica set or
+# mongos. TOKEN_LEDGER_TRANSACTIONS=auto (default) asks the server on first
+# use; true/false force it, e.g. false on a standalone mongod
+_transactions_setting = os.getenv('TOKEN_LEDGER_TRANSACTIONS', 'auto').lower()
+token_ledger = TokenLedger(
+    mongo.db.users,
+    mongo.db.token_ledger,
+    use_transactions=None if _transactions_setting == 'auto' else _transactions_setting == 'true'
+)
+
+# Batch allocations (epoch rewards, airdrops) run as resumable background jobs
+airdrop_engine = AirdropEngine(
+    token_ledger,
+    mongo.db.token_airdrops,
+    mongo.db.token_airdrop_recipients,
+    chunk_size=int(os.getenv('AIRDROP_CHUNK_SIZE', 1000)),
+    on_credited=lambda user_ids: resource_versions.bump(*[f'tokens:{user_id}' for user_id in user_ids])
+)
+
+# Point-in-time balances for vote weights: periodic checkpoints plus a bounded ledger replay
+balance_snapshots = BalanceSnapshots(
+    mongo.db.users,
+    mongo.db.token_ledger,
+    mongo.db.balance_checkpoints,
+    settle_seconds=float(os.getenv('BALANCE_CHECKPOINT_SETTLE', 60))
+)
+BALANCE_CHECKPOINT_INTERVAL = float(os.getenv('BALANCE_CHECKPOINT_INTERVAL', 3600))
+
+class GovernanceTokenManager:
+    ALLOCATION_RULES = {
+        'signup': 100,
+        'proposal_creation': 50,
+        'successful_proposal': 200,
+        'active_voter': 25
+    }
+    
+    @classmethod
+    def allocate_initial_tokens(cls, user_id: str, allocation_type: str = 'signup') -> dict:
+        """
+        Allocate initial governance tokens to a user
+        """
+        token_amount = cls.ALLOCATION_RULES.get(allocation_type, 0)
+        
+        try:
+            # Update user's token balance and record the ledger entry
+            allocated = token_ledger.credit(user_id, token_amount, allocation_type)
+            
+            resource_versions.bump(f'tokens:{user_id}')
+            
+            return {
+                'allocated_tokens': token_amount,
+                'allocation_type': allocation_type,
+                'success': allocated
+            }
+        except Exception as e:
+            return {
+                'error': str(e),
+                'success': False
+            }
+    
+    @classmethod
+    def transfer_tokens(cls, from_user_id: str, to_user_id: str, amount: int) -> dict:
+        """
+        Transfer governance tokens between users
+        """
+        try:
+            # Conditional debit: no separate balance read, so no overdraft race
+            status = token_ledger.transfer(from_user_id, to_user_id, amount)
+            if status == 'insufficient_funds':
+                return {
+                    'error': 'Insufficient tokens',
+                    'success': False
+                }
+            if status == 'unknown_recipient':
+                return {
+                    'error': 'Recipient not found',
+                    'success': False
+                }
+            
+            resource_versions.bump(f'tokens:{from_user_id}', f'tokens:{to_user_id}')
+            
+            return {
+                'transferred_tokens': amount,
+                'success': True
+            }
+        except Exception as e:
+            return {
+                'error': str(e),
+                'success': False
+            }
+    
+    @classmethod
+    def get_token_history(cls,
+                          user_id: str,
+                          limit: int = DEFAULT_HISTORY_PAGE_SIZE,
+                          cursor: str = None,
+                          start: datetime = None,
+                          end: datetime = None,
+                          types: list = None) -> dict:
+        """
+        Retrieve one page of token transactions for a user
+        
+        Args:
+            user_id (str): Owner of the history
+            limit (int): Page size
+            cursor (str, optional): next_cursor of the previous page
+            start (datetime, optional): Earliest timestamp, inclusive
+            end (datetime, optional): Latest timestamp, exclusive
+            types (list, optional): Only transactions of these types
+        
+        Returns:
+            Balance, the page of transactions and the next page's cursor
+        """
+        try:
+            balance = token_ledger.balance(user_id)
+            if balance is None:
+                return {
+                    'error': 'User not found',
+                    'success': False
+                }
+            
+            token_history, next_cursor = token_ledger.history(
+                user_id,
+                limit=limit,
+                cursor=cursor,
+                start=start,
+                end=end,
+                types=types
+            )
+            return {
+                'current_balance': balance,
+                'token_history': token_history,
+                'next_cursor': next_cursor,
+                'success': True
+            }
+        except Exception as e:
+            return {
+                'error': str(e),
+                'success': False
+            }
+
+@bp.route('/api/tokens/allocate', methods=['POST'])
+def allocate_tokens():
+    """
+    Endpoint for token allocation
+    """
+    try:
+        data = request.json
+        user_id = data.get('user_id')
+        allocation_type = data.get('allocation_type', 'signup')
+        
+        if not user_id:
+            return jsonify({'error': 'User ID is required'}), 400
+        
+        result = GovernanceTokenManager.allocate_initial_tokens(user_id, allocation_type)
+        
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/tokens/transfer', methods=['POST'])
+def transfer_tokens():
+    """
+    Endpoint for token transfer
+    """
+    try:
+        data = request.json
+        from_user_id = data.get('from_user_id')
+        to_user_id = data.get('to_user_id')
+        amount = data.get('amount')
+        
+        if not all([from_user_id, to_user_id, amount]):
+            return jsonify({'error': 'All fields are required'}), 400
+        
+        if not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+            return jsonify({'error': 'Amount must be a positive integer'}), 400
+        
+        result = GovernanceTokenManager.transfer_tokens(from_user_id, to_user_id, amount)
+        
+        if result.get('success'):
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/tokens/history', methods=['GET'])
+def get_token_history():
+    """
+    Endpoint to retrieve token transaction history, newest first
+    
+    Query parameters: user_id, limit, cursor (next_cursor of the previous
+    page), start / end (ISO 8601, end exclusive) and type (comma-separated)
+    """
+    try:
+        user_id = request.args.get('user_id')
+        
+        if not user_id:
+            return jsonify({'error': 'User ID is required'}), 400
+        
+        try:
+            limit = min(int(request.args.get('limit', DEFAULT_HISTORY_PAGE_SIZE)), MAX_HISTORY_PAGE_SIZE)
+            if limit < 1:
+                return jsonify({'error': 'limit must be positive'}), 400
+            
+            cursor = request.args.get('cursor')
+            if cursor:
+                TokenLedger.decode_cursor(cursor)
+            start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else None
+            end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else None
+        except ValueError:
+            return jsonify({'error': 'Invalid limit, cursor, start or end'}), 400
+        
+        type_filter = request.args.get('type')
+        types = [entry_type for entry_type in type_filter.split(',') if entry_type] if type_filter else None
+        
+        def build():
+            result = GovernanceTokenManager.get_token_history(
+                user_id,
+                limit=limit,
+                cursor=cursor,
+                start=start,
+                end=end,
+                types=types
+            )
+            
+            if result.get('success'):
+                return jsonify(result), 200
+            else:
+                return jsonify(result), 400
+        
+        etag = resource_versions.etag(
+            f'tokens:{user_id}',
+            limit,
+            cursor,
+            request.args.get('start'),
+            request.args.get('end'),
+            type_filter
+        )
+        return conditional_response(etag, build)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/tokens/airdrops', methods=['POST'])
+def start_airdrop():
+    """
+    Allocate tokens to many users as a background job
+
+    Body: allocation_type, plus either user_ids (list) or query (a users
+    filter). Posting an existing airdrop_id resumes it instead of starting
+    a new one, so retries never credit a user twice.
+    """
+    try:
+        data = request.json or {}
+        allocation_type = data.get('allocation_type')
+        
+        if allocation_type not in GovernanceTokenManager.ALLOCATION_RULES:
+            return jsonify({'error': 'Unknown allocation type'}), 400
+        
+        progress = airdrop_engine.start(
+            airdrop_id=data.get('airdrop_id') or str(uuid.uuid4()),
+            allocation_type=allocation_type,
+            amount=GovernanceTokenManager.ALLOCATION_RULES[allocation_type],
+            user_ids=data.get('user_ids'),
+            query=data.get('query')
+        )
+        return jsonify(progress), 202
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/tokens/airdrops/<airdrop_id>', methods=['GET'])
+def get_airdrop_progress(airdrop_id):
+    """
+    Progress of a batch allocation
+    """
+    try:
+        progress = airdrop_engine.progress(airdrop_id)
+        if not progress:
+            return jsonify({'error': 'Airdrop not found'}), 404
+        return jsonify(progress), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/tokens/balance-at', methods=['GET'])
+def get_balance_at():
+    """
+    Balance of a user at a point in time
+
+    Query parameters: user_id, at (ISO 8601, inclusive)
+    """
+    try:
+        user_id = request.args.get('user_id')
+        if not user_id or 'at' not in request.args:
+            return jsonify({'error': 'user_id and at are required'}), 400
+        
+        try:
+            at = datetime.fromisoformat(request.args['at'])
+        except ValueError:
+            return jsonify({'error': 'Invalid at'}), 400
+        
+        return jsonify({
+            'user_id': user_id,
+            'at': at,
+            'balance': balance_snapshots.balance_at(user_id, at)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/tokens/proposals/<proposal_id>/weights', methods=['GET'])
+def get_proposal_vote_weights(proposal_id):
+    """
+    Snapshot token weight of every voter on a proposal
+
+    The snapshot is taken at the proposal's snapshot_at (or creation time),
+    unless an `at` query parameter overrides it.
+    """
+    try:
+        try:
+            proposal = mongo.db.proposals.find_one({'_id': ObjectId(proposal_id)}, {'snapshot_at': 1})
+            if not proposal:
+                return jsonify({'error': 'Proposal not found'}), 404
+            at = datetime.fromisoformat(request.args['at']) if 'at' in request.args \
+                else BalanceSnapshots.proposal_snapshot_time(proposal)
+        except (InvalidId, ValueError):
+            return jsonify({'error': 'Invalid proposal ID or at'}), 400
+        
+        weights = balance_snapshots.voter_weights(mongo.db.votes, proposal['_id'], at)
+        return jsonify({'proposal_id': proposal_id, **weights}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+_background_jobs_started = False
+
+def start_background_jobs():
+    """
+    Resume interrupted airdrops and start periodic balance checkpoints
+
+    Runs when this module builds its app unless BACKGROUND_JOBS=false;
+    service_host calls it too. Later calls do nothing.
+    """
+    global _background_jobs_started
+    if _background_jobs_started:
+        return
+    _background_jobs_started = True
+    airdrop_engine.resume_incomplete()
+    if BALANCE_CHECKPOINT_INTERVAL > 0:
+        balance_snapshots.start(BALANCE_CHECKPOINT_INTERVAL)
+
+app = create_app(__name__, bp)
+
+# Started with the app, so both python token_management.py and
+# gunicorn token_management:app run them
+if os.getenv('BACKGROUND_JOBS', 'true').lower() == 'true':
+    start_background_jobs()
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5002)
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Any, Optional
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from periodic import PeriodicTask
+
+DUPLICATE_KEY_ERROR = 11000
+
+class VoteLedger:
+    """
+    Append-only record of individual votes, one per (proposal, voter)
+
+    A unique compound index (proposal_voter_unique, declared in
+    db_indexes.py) rejects repeated votes at the storage layer,
+    so retries are idempotent without a read before each write.
+    """
+    def __init__(self, votes_collection):
+        self.votes = votes_collection
+        self._reconciler = None
+        # Upper end of the vote window checked by the last reconciliation
+        self._reconciled_through = None
+        # Proposals skipped last time, checked again on the next run
+        self._deferred = set()
+
+    @staticmethod
+    def build_vote(proposal_id, vote_data: Dict[str, Any]) -> dict:
+        """
+        Ledger document for a validated vote
+        """
+        return {
+            'proposal_id': proposal_id,
+            'voter_address': vote_data['voter_address'].lower(),
+            'vote_direction': vote_data['vote_direction'],
+            'signature': vote_data.get('signature'),
+            'created_at': datetime.utcnow()
+        }
+
+    def record_vote(self, vote: dict) -> bool:
+        """
+        Store a single vote
+
+        Returns:
+            True if the vote is new, False if this voter already voted
+        """
+        try:
+            self.votes.insert_one(vote)
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def record_votes(self, votes: List[dict]) -> List[str]:
+        """
+        Store many votes with one unordered insert
+
+        Returns:
+            Per-vote status in input order: 'recorded', 'duplicate' or 'error'
+        """
+        if not votes:
+            return []
+
+        statuses = ['recorded'] * len(votes)
+        try:
+            self.votes.insert_many(votes, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                statuses[error['index']] = 'duplicate' if error['code'] == DUPLICATE_KEY_ERROR else 'error'
+        return statuses
+
+    def tally(self, proposal_id) -> dict:
+        """
+        Vote counts for a proposal, derived from the ledger
+        """
+        totals = {'total_participants': 0}
+        for row in self.votes.aggregate([
+            {'$match': {'proposal_id': proposal_id}},
+            {'$group': {'_id': '$vote_direction', 'count': {'$sum': 1}}}
+        ]):
+            totals[row['_id']] = row['count']
+            totals['total_participants'] += row['count']
+        return totals
+
+    def reconcile(self, proposal_id, proposals_collection) -> Optional[dict]:
+        """
+        Overwrite a proposal's cached vote counters with the ledger tally
+
+        The counters are only replaced if no flush changed them while the
+        ledger was being counted.
+
+        Returns:
+            The ledger tally, or None if the counters changed or the
+            proposal does not exist
+        """
+        current = proposals_collection.find_one({'_id': proposal_id}, {'votes': 1})
+        if current is None:
+            return None
+        totals = self.tally(proposal_id)
+        result = proposals_collection.update_one(
+            {'_id': proposal_id, 'votes': current.get('votes')},
+            {'$set': {'votes': totals}}
+        )
+        return totals if result.matched_count else None
+
+    def reconcile_settled(self,
+                          proposals_collection,
+                          settled_before: datetime,
+                          since: datetime = None,
+                          skip: Callable[[Any], bool] = None) -> Dict[str, set]:
+        """
+        Reconcile the proposals that received votes in (since, settled_before]
+        and none after settled_before
+
+        Votes newer than settled_before may still be buffered by some
+        process's tally; reconciling their proposal now would count them
+        again once that buffer flushes.
+
+        Args:
+            proposals_collection: Mongo collection holding the counters
+            settled_before (datetime): Votes up to here have been flushed by every process
+            since (datetime, optional): Lower end of the window; None checks every vote
+            skip (Callable, optional): Predicate for proposals to leave for later,
+                e.g. ones with increments still buffered in this process
+
+        Returns:
+            Dict with the 'reconciled' and the 'deferred' proposal ids
+        """
+        window = {'$lte': settled_before}
+        if since is not None:
+            window['$gt'] = since
+        candidates = self.votes.aggregate([
+            {'$match': {'created_at': window}},
+            {'$group': {'_id': '$proposal_id'}}
+        ], allowDiskUse=True)
+        active = set(self.votes.distinct('proposal_id', {'created_at': {'$gt': settled_before}}))
+
+        reconciled, deferred = set(), set()
+        for proposal_id in set(row['_id'] for row in candidates) | self._deferred:
+            if proposal_id in active or (skip is not None and skip(proposal_id)):
+                deferred.add(proposal_id)
+            elif self.reconcile(proposal_id, proposals_collection) is not None:
+                reconciled.add(proposal_id)
+            elif proposals_collection.count_documents({'_id': proposal_id}, limit=1):
+                deferred.add(proposal_id)
+        return {'reconciled': reconciled, 'deferred': deferred}
+
+    def start_reconciler(self,
+                         proposals_collection,
+                         interval: float,
+                         settle_seconds: float = 60.0,
+                         skip: Callable[[Any], bool] = None):
+        """
+        Reconcile every proposal's counters now, then those of proposals
+        voted on since the previous run, every interval seconds
+
+        Args:
+            proposals_collection: Mongo collection holding the counters
+            interval (float): Seconds between runs
+            settle_seconds (float): How long after a proposal's latest vote
+                it is left alone; must exceed the tally flush interval
+            skip (Callable, optional): See reconcile_settled()
+        """
+        def run():
+            settled_before = datetime.utcnow() - timedelta(seconds=settle_seconds)
+            result = self.reconcile_settled(proposals_collection, settled_before, self._reconciled_through, skip)
+            self._reconciled_through = settled_before
+            self._deferred = result['deferred']
+
+        if self._reconciler is None:
+            self._reconciler = PeriodicTask(run, interval, 'vote-reconciler', run_on_start=True)
+        self._reconciler.start()
+
+    def stop(self):
+        if self._reconciler is not None:
+            self._reconciler.stop()
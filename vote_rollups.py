@@ -0,0 +1,166 @@
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from periodic import PeriodicTask
+from vote_ledger import DUPLICATE_KEY_ERROR
+from vote_tally import FLUSH_ID_HISTORY
+
+GRANULARITIES = ('minute', 'hour', 'day')
+# Recent flush ids kept on each bucket, so a retried flush is not applied twice
+FLUSH_IDS_FIELD = '_rollup_flushes'
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """
+    Truncate a timestamp to the start of its bucket
+    """
+    if granularity == 'minute':
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+class VoteRollups:
+    """
+    Pre-aggregated vote counts per minute, hour and day, both per proposal
+    and across all proposals
+
+    Votes are counted in memory and written as one bulk upsert per flush,
+    so the hot global buckets see one write per flush interval rather than
+    one per vote.
+    """
+    def __init__(self, rollups_collection, flush_interval: float = 1.0):
+        self.rollups = rollups_collection
+        self.flush_interval = flush_interval
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Bucket increments not yet acknowledged by Mongo, with the flush id
+        # they are (re)tried under; only touched while holding _flush_lock
+        self._in_flight = {}
+        self._in_flight_id = None
+        self._flusher = PeriodicTask(self.flush, flush_interval, 'rollup-flusher', run_on_stop=True)
+
+    def record(self, proposal_id, vote_direction: str, timestamp: datetime, count: int = 1):
+        """
+        Count votes cast at timestamp
+        """
+        minute = bucket_start(timestamp, 'minute')
+        with self._lock:
+            self._counts[(proposal_id, minute, vote_direction)] += count
+        self._flusher.start()
+
+    def flush(self) -> int:
+        """
+        Upsert pending counts into the rollup documents
+
+        A failed batch is kept and retried under the same flush id before
+        new counts are taken. Buckets that already carry the id are skipped
+        by the filter; their upsert then fails with a duplicate key, which
+        means that bucket was written by the earlier attempt.
+
+        Returns:
+            Number of rollup documents written
+        """
+        with self._flush_lock:
+            written = 0
+            while True:
+                retrying = bool(self._in_flight)
+                if not retrying:
+                    with self._lock:
+                        counts, self._counts = self._counts, Counter()
+                    self._in_flight = self._bucket_increments(counts)
+                    self._in_flight_id = uuid.uuid4().hex
+                if not self._in_flight:
+                    return written
+
+                keys = list(self._in_flight)
+                try:
+                    self.rollups.bulk_write(
+                        [self._upsert(key, self._in_flight[key], self._in_flight_id) for key in keys],
+                        ordered=False
+                    )
+                    failed = set()
+                except BulkWriteError as e:
+                    failed = {
+                        keys[error['index']]
+                        for error in e.details.get('writeErrors', [])
+                        if error['code'] != DUPLICATE_KEY_ERROR
+                    }
+                    if failed:
+                        print(f"Vote rollup flush error: {len(failed)} buckets not written, will retry")
+                except Exception as e:
+                    print(f"Vote rollup flush error: {e}")
+                    return written
+
+                written += len(keys) - len(failed)
+                self._in_flight = {key: self._in_flight[key] for key in failed}
+                if failed or not retrying:
+                    return written
+
+    @staticmethod
+    def _bucket_increments(counts: Counter) -> dict:
+        """
+        Fold per-minute counts into every bucket and scope they belong to
+        """
+        increments = {}
+        for (proposal_id, minute, vote_direction), count in counts.items():
+            for granularity in GRANULARITIES:
+                bucket = bucket_start(minute, granularity)
+                for scope, scope_id in (('proposal', proposal_id), ('global', None)):
+                    key = (scope, scope_id, granularity, bucket)
+                    fields = increments.setdefault(key, Counter())
+                    fields[f'votes.{vote_direction}'] += count
+                    fields['votes.total'] += count
+        return increments
+
+    @staticmethod
+    def _upsert(key: tuple, fields: Counter, flush_id: str) -> UpdateOne:
+        scope, scope_id, granularity, bucket = key
+        return UpdateOne(
+            {'_id': f"{scope}:{scope_id}:{granularity}:{bucket.isoformat()}", FLUSH_IDS_FIELD: {'$ne': flush_id}},
+            {
+                '$inc': dict(fields),
+                '$push': {FLUSH_IDS_FIELD: {'$each': [flush_id], '$slice': -FLUSH_ID_HISTORY}},
+                '$setOnInsert': {
+                    'scope': scope,
+                    'proposal_id': scope_id,
+                    'granularity': granularity,
+                    'bucket': bucket
+                }
+            },
+            upsert=True
+        )
+
+    def series(self, granularity: str, start: datetime, end: datetime, proposal_id=None, limit: int = 10000) -> list:
+        """
+        Vote counts per bucket in [start, end), global unless proposal_id is given
+        """
+        query = self.series_query(granularity, start, end, proposal_id)
+        buckets = self.rollups.find(query, {'_id': 0, 'bucket': 1, 'votes': 1}).sort('bucket', 1).limit(limit)
+        return [{'bucket': bucket['bucket'], 'votes': bucket.get('votes', {})} for bucket in buckets]
+
+    @staticmethod
+    def series_query(granularity: str, start: datetime, end: datetime, proposal_id=None) -> dict:
+        """
+        Filter selecting the buckets of one series in [start, end)
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+
+        return {
+            'scope': 'proposal' if proposal_id is not None else 'global',
+            'granularity': granularity,
+            'proposal_id': proposal_id,
+            'bucket': {'$gte': bucket_start(start, granularity), '$lt': end}
+        }
+
+    def stop(self):
+        """
+        Stop the background flusher and write everything still pending
+        """
+        self._flusher.stop()
@@ -0,0 +1,278 @@
+import itertools
+import threading
+import uuid
+from collections import Counter, defaultdict
+from pymongo import UpdateOne
+from periodic import PeriodicTask
+
+# Recent flush ids kept on each proposal, so a retried flush is not applied twice
+FLUSH_IDS_FIELD = '_tally_flushes'
+FLUSH_ID_HISTORY = 20
+
+class VoteShard:
+    """
+    One independently locked slice of the vote buffer
+    """
+    __slots__ = ('lock', 'counts', 'pending')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(Counter)
+        self.pending = 0
+
+class VoteTallyBuffer:
+    """
+    Coalesces per-vote counter increments in memory and flushes them to the
+    proposal documents as periodic bulk $inc writes
+
+    Durability: in 'buffered' mode a vote is acknowledged once it is in
+    memory, so votes recorded within the last flush_interval seconds are
+    lost if the process dies. In 'immediate' mode every vote is written
+    with its own update before returning, as before.
+    """
+    def __init__(self,
+                 proposals_collection,
+                 mode: str = 'buffered',
+                 n_shards: int = 16,
+                 flush_interval: float = 0.5,
+                 max_pending: int = 10000,
+                 on_applied=None):
+        """
+        Args:
+            proposals_collection: Mongo collection holding the proposals
+            mode (str): 'buffered' or 'immediate'
+            n_shards (int): Number of independently locked buffers
+            flush_interval (float): Seconds between background flushes
+            max_pending (int): Approximate pending vote count that forces an inline flush
+            on_applied (Callable, optional): Called with {proposal_id: Counter}
+                after increments are written to Mongo
+        """
+        if mode not in ('buffered', 'immediate'):
+            raise ValueError(f"Unknown vote tally mode: {mode}")
+
+        self.proposals = proposals_collection
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_applied = on_applied
+        # Each writer thread is assigned a shard round-robin, so concurrent voters rarely share a lock
+        self._shards = [VoteShard() for _ in range(n_shards)]
+        self._shard_limit = max(1, max_pending // n_shards)
+        self._shard_counter = itertools.count()
+        self._thread_shard = threading.local()
+        self._flush_lock = threading.Lock()
+        # Guards the shard swap and _in_flight together, so pending() never misses a batch
+        self._state_lock = threading.Lock()
+        # Increments taken out of the shards but not yet acknowledged by Mongo,
+        # with the flush id they are (re)tried under
+        self._in_flight = {}
+        self._in_flight_id = None
+        self._flusher = PeriodicTask(self.flush, flush_interval, 'vote-flusher', run_on_stop=True)
+
+    @staticmethod
+    def validate_direction(vote_direction: str):
+        """
+        Reject directions that Mongo would read as operators or nested paths
+        """
+        if not isinstance(vote_direction, str) or not vote_direction \
+                or '.' in vote_direction or vote_direction.startswith('$'):
+            raise ValueError(f"Invalid vote direction: {vote_direction!r}")
+
+    @classmethod
+    def _counter_fields(cls, vote_direction: str, count: int) -> dict:
+        cls.validate_direction(vote_direction)
+        return {f'votes.{vote_direction}': count, 'votes.total_participants': count}
+
+    @classmethod
+    def coalesce(cls, votes) -> dict:
+        """
+        Counter increments for many votes, in the form record_many() takes
+
+        Args:
+            votes: Iterable of (proposal_id, vote_direction) pairs
+        """
+        increments = defaultdict(Counter)
+        for proposal_id, vote_direction in votes:
+            increments[proposal_id].update(cls._counter_fields(vote_direction, 1))
+        return dict(increments)
+
+    def record(self, proposal_id, vote_direction: str, count: int = 1) -> dict:
+        """
+        Count votes for a proposal
+
+        Returns:
+            Dict with the durability mode and, in immediate mode, the
+            number of modified documents
+        """
+        fields = self._counter_fields(vote_direction, count)
+
+        if self.mode == 'immediate':
+            result = self.proposals.update_one({'_id': proposal_id}, {'$inc': fields})
+            self._notify({proposal_id: Counter(fields)})
+            return {'durability': 'immediate', 'modified_count': result.modified_count}
+
+        self._flusher.start()
+        shard = self._shard()
+        with shard.lock:
+            shard.counts[proposal_id].update(fields)
+            shard.pending += count
+            should_flush = shard.pending >= self._shard_limit
+
+        if should_flush:
+            self.flush()
+        return {'durability': 'buffered', 'modified_count': None}
+
+    def _shard(self) -> VoteShard:
+        # Thread idents are aligned to large powers of two, so they cannot be used as a hash
+        index = getattr(self._thread_shard, 'index', None)
+        if index is None:
+            index = self._thread_shard.index = next(self._shard_counter) % len(self._shards)
+        return self._shards[index]
+
+    def record_many(self, increments: dict, flush_id: str = None) -> int:
+        """
+        Apply already-coalesced counter increments in one bulk write
+
+        Args:
+            increments (dict): proposal_id -> Counter of 'votes.*' fields
+            flush_id (str, optional): Makes the write idempotent: proposals
+                already updated under this id are skipped
+
+        Returns:
+            Number of modified proposal documents
+        """
+        operations = []
+        for proposal_id, fields in increments.items():
+            if not fields:
+                continue
+            if flush_id is None:
+                operations.append(UpdateOne({'_id': proposal_id}, {'$inc': dict(fields)}))
+            else:
+                operations.append(UpdateOne(
+                    {'_id': proposal_id, FLUSH_IDS_FIELD: {'$ne': flush_id}},
+                    {
+                        '$inc': dict(fields),
+                        '$push': {FLUSH_IDS_FIELD: {'$each': [flush_id], '$slice': -FLUSH_ID_HISTORY}}
+                    }
+                ))
+        if not operations:
+            return 0
+        result = self.proposals.bulk_write(operations, ordered=False)
+        self._notify(increments)
+        return result.modified_count
+
+    def pending(self, proposal_id) -> Counter:
+        """
+        Counter increments for a proposal that have not been flushed yet
+        """
+        with self._state_lock:
+            totals = Counter(self._in_flight.get(proposal_id, {}))
+            for shard in self._shards:
+                with shard.lock:
+                    totals.update(shard.counts.get(proposal_id, {}))
+        return totals
+
+    def live_totals(self, proposal_id) -> dict:
+        """
+        Persisted vote counters plus pending increments
+        """
+        proposal = self.proposals.find_one({'_id': proposal_id}, {'votes': 1}) or {}
+        return self.with_pending(proposal_id, proposal.get('votes'))
+
+    def with_pending(self, proposal_id, persisted_votes: dict) -> dict:
+        """
+        Add pending increments to vote counters read from Mongo
+        """
+        totals = Counter(persisted_votes or {})
+        for field, count in self.pending(proposal_id).items():
+            totals[field.split('.', 1)[1]] += count
+        return dict(totals)
+
+    def flush(self) -> int:
+        """
+        Write all pending increments with a single unordered bulk write
+
+        An unordered bulk write can fail part-way, so every flush carries a
+        flush id and a failed batch is retried under the same id: proposals
+        it already reached are skipped instead of counted twice.
+
+        Returns:
+            Number of proposals in the written batches
+        """
+        with self._flush_lock:
+            written = 0
+            while True:
+                with self._state_lock:
+                    retrying = bool(self._in_flight)
+                    if not retrying:
+                        self._in_flight = self._take_shards()
+                        self._in_flight_id = uuid.uuid4().hex
+                    batch, flush_id = self._in_flight, self._in_flight_id
+                if not batch:
+                    return written
+
+                try:
+                    self.record_many(batch, flush_id)
+                except Exception as e:
+                    # Kept in flight; the next flush retries it under the same id
+                    print(f"Vote flush error: {e}")
+                    self._drop_applied(batch, flush_id)
+                    return written
+
+                with self._state_lock:
+                    self._in_flight = {}
+                    self._in_flight_id = None
+                written += len(batch)
+                # After a successful retry, go round once more for the increments buffered since
+                if not retrying:
+                    return written
+
+    def _drop_applied(self, batch: dict, flush_id: str):
+        """
+        Remove proposals a failed flush did reach from the in-flight batch,
+        so live totals do not count them twice until the retry
+        """
+        try:
+            applied = {
+                proposal['_id']
+                for proposal in self.proposals.find(
+                    {'_id': {'$in': list(batch)}, FLUSH_IDS_FIELD: flush_id},
+                    {'_id': 1}
+                )
+            }
+        except Exception:
+            return
+        if applied:
+            self._notify({proposal_id: batch[proposal_id] for proposal_id in applied})
+        with self._state_lock:
+            if self._in_flight_id == flush_id:
+                self._in_flight = {
+                    proposal_id: fields for proposal_id, fields in batch.items() if proposal_id not in applied
+                }
+
+    def _take_shards(self) -> dict:
+        """
+        Swap out every shard's counts; call with the state lock held
+        """
+        merged = defaultdict(Counter)
+        for shard in self._shards:
+            with shard.lock:
+                counts, shard.counts = shard.counts, defaultdict(Counter)
+                shard.pending = 0
+            for proposal_id, fields in counts.items():
+                merged[proposal_id].update(fields)
+        return dict(merged)
+
+    def _notify(self, increments: dict):
+        if self.on_applied is None:
+            return
+        try:
+            self.on_applied(increments)
+        except Exception as e:
+            print(f"Vote tally callback error: {e}")
+
+    def stop(self):
+        """
+        Stop the background flusher and write everything still pending
+        """
+        self._flusher.stop()